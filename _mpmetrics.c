@@ -11,12 +11,31 @@
 
 static int Buffer_init(BufferObject *self, PyObject *args, PyObject *kwds)
 {
-	PyObject *size_obj;
+	PyObject *size_obj, *offset_obj;
+	Py_ssize_t offset = 0;
 	size_t size;
 
 	if (!PyArg_ParseTuple(args, "w*", &self->shm))
 		return -1;
 
+	/*
+	 * Other keyword arguments (such as 'heap') are passed to every type in
+	 * a Struct, so ignore anything we don't recognize.
+	 */
+	offset_obj = kwds ? PyDict_GetItemString(kwds, "offset") : NULL;
+	if (offset_obj) {
+		offset = PyLong_AsSsize_t(offset_obj);
+		if (PyErr_Occurred())
+			goto error;
+
+		if (offset < 0 || offset > self->shm.len) {
+			PyErr_Format(PyExc_ValueError,
+				     "offset %zd out of range for shared memory (%zd bytes)",
+				     offset, self->shm.len);
+			goto error;
+		}
+	}
+
 	size_obj = PyObject_GetAttrString((PyObject *)self, "size");
 	if (!size_obj)
 		goto error;
@@ -26,13 +45,16 @@ static int Buffer_init(BufferObject *self, PyObject *args, PyObject *kwds)
 	if (PyErr_Occurred())
 		goto error;
 
-	if ((size_t)self->shm.len < size) {
+	if ((size_t)(self->shm.len - offset) < size) {
 		PyErr_Format(PyExc_ValueError,
 			     "shared memory (%zd bytes) too small; must be at least %zu bytes",
-			     self->shm.len, size);
+			     self->shm.len - offset, size);
 		goto error;
 	}
 
+	/* PyBuffer_Release only looks at shm.obj, so this is safe */
+	self->shm.buf = (char *)self->shm.buf + offset;
+	self->shm.len -= offset;
 	return 0;
 
 error:
@@ -82,11 +104,11 @@ PyTypeObject BufferType = {
 	.tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE |
 		    Py_TPFLAGS_HAVE_GC,
 	.tp_name = "_mpmetrics.Buffer",
-	.tp_doc = PyDoc_STR("Buffer(mem)\n"
+	.tp_doc = PyDoc_STR("Buffer(mem, offset=0)\n"
 			    "--\n"
 			    "\n"
-			    "Create a buffer backed by 'mem'. This is a base class for other C\n"
-			    "classes in _mpmetrics."),
+			    "Create a buffer backed by 'mem', starting 'offset' bytes in. This\n"
+			    "is a base class for other C classes in _mpmetrics."),
 	.tp_new = PyType_GenericNew,
 	.tp_init = (initproc)Buffer_init,
 	.tp_dealloc = (destructor)Buffer_dealloc,
@@ -144,6 +166,17 @@ int PyType_AddULLConstant(PyTypeObject *type, const char *name,
 	return PyType_AddConstant(type, name, obj);
 }
 
+int PyType_AddStringConstant(PyTypeObject *type, const char *name,
+			      const char *value)
+{
+	PyObject *obj = PyUnicode_FromString(value);
+
+	if (!obj)
+		return -1;
+
+	return PyType_AddConstant(type, name, obj);
+}
+
 int PyType_AddDoubleConstant(PyTypeObject *type, const char *name,
 			     double value)
 {
@@ -178,6 +211,9 @@ PyMODINIT_FUNC PyInit__mpmetrics(void)
 	if (PyModule_AddType(m, &BufferType))
 		goto error;
 
+	if (PyModule_AddFunctions(m, UtilMethods))
+		goto error;
+
 	if (LockType_Add(m))
 		goto error;
 
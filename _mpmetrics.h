@@ -33,6 +33,10 @@ int PyType_AddULLConstant(PyTypeObject *type, const char *name,
 			  unsigned long long value);
 int PyType_AddDoubleConstant(PyTypeObject *type, const char *name,
 			     double value);
+int PyType_AddStringConstant(PyTypeObject *type, const char *name,
+			      const char *value);
+
+extern PyMethodDef UtilMethods[];
 
 int LockType_Add(PyObject *m);
 int AtomicTypes_Add(PyObject *m);
@@ -6,6 +6,7 @@
 #ifdef DOUBLE
 #define PTYPE double
 #define FORMAT "f"
+#define STRUCT_FORMAT "d"
 #define DOCTYPE "float"
 #define NAME AtomicDouble
 #define LONGNAME "atomic double"
@@ -15,6 +16,7 @@
 #else /* DOUBLE */
 #ifdef SIGNED
 #define FORMAT paste(PRId, WIDTH)
+#define STRUCT_FORMAT (WIDTH == 64 ? "q" : "i")
 #define PTYPE paste(paste(int, WIDTH), _t)
 #define NAME paste(AtomicInt, WIDTH)
 #define LONGNAME "atomic " stringify(WIDTH) "-bit signed integer"
@@ -22,6 +24,7 @@
 #else /* SIGNED */
 #define PTYPE paste(paste(uint, WIDTH), _t)
 #define FORMAT paste(PRIu, WIDTH)
+#define STRUCT_FORMAT (WIDTH == 64 ? "Q" : "I")
 #define NAME paste(AtomicUInt, WIDTH)
 #define LONGNAME "atomic " stringify(WIDTH) "-bit unsigned integer"
 #define FROM PyLong_FromUnsignedLongLong
@@ -79,14 +82,17 @@ static PyObject *ADD(OBJECT *self, PyObject *args, PyObject *kwds)
 {
 	PTYPE amount, old;
 
-	char *keywords[] = { "amount", "raise_on_overflow", NULL };
-	int raise = 1;
+	char *keywords[] = { "amount", "raise_on_overflow", "relaxed", NULL };
+	int raise = 1, relaxed = 0;
+	memory_order order;
 	PyObject *amount_obj;
 
-	if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|p", keywords,
-					 &amount_obj, &raise))
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|pp", keywords,
+					 &amount_obj, &raise, &relaxed))
 		return NULL;
 
+	order = relaxed ? memory_order_relaxed : memory_order_seq_cst;
+
 	amount = AS(amount_obj);
 	if (PyErr_Occurred())
 		return NULL;
@@ -95,14 +101,17 @@ static PyObject *ADD(OBJECT *self, PyObject *args, PyObject *kwds)
 	PTYPE new;
 
 	do {
-		old = atomic_load((_Atomic PTYPE *)self->shm.buf);
+		old = atomic_load_explicit((_Atomic PTYPE *)self->shm.buf,
+					   order);
 		new = old + amount;
-	} while (!atomic_compare_exchange_weak((_Atomic PTYPE *)self->shm.buf,
-					       &old, new));
+	} while (!atomic_compare_exchange_weak_explicit((_Atomic PTYPE *)self->shm.buf,
+							&old, new, order,
+							order));
 #else
 	PTYPE dummy;
 
-	old = atomic_fetch_add((_Atomic PTYPE *)self->shm.buf, amount);
+	old = atomic_fetch_add_explicit((_Atomic PTYPE *)self->shm.buf, amount,
+					order);
 	/*
 	 * __builtin_add_overflow_p is gcc-specific, so just use
 	 * __builtin_add_overflow and ignore the result 
@@ -139,19 +148,21 @@ static PyMethodDef METHODS[] = {
 		.ml_name = "add",
 		.ml_meth = (PyCFunction)ADD,
 		.ml_flags = METH_VARARGS | METH_KEYWORDS,
-		.ml_doc = PyDoc_STR("add(amount, raise_on_overflow=True) -> " DOCTYPE "\n"
+		.ml_doc = PyDoc_STR("add(amount, raise_on_overflow=True, relaxed=False) -> " DOCTYPE "\n"
 				    "\n"
 #ifdef DOUBLE
 				    "Add 'amount' to the backing " DOCTYPE " and return the value\n"
 				    "from before the addition. The value of 'raise_on_overflow'\n"
-				    "is ignored."),
+				    "is ignored."
 #else
 				    "Add 'amount' to the backing " DOCTYPE " and return the value\n"
 				    "from before the addition. If the addition overflows, the\n"
 				    "result will wrap around (using two's complement addition)\n"
 				    "and, if 'raise_on_overflow' is True, an exception will be\n"
-				    "raised."),
+				    "raised."
 #endif
+				    " If 'relaxed' is True, the addition is not ordered\n"
+				    "with respect to other memory accesses."),
 	},
 	{ 0 },
 };
@@ -204,6 +215,9 @@ static int TYPE_ADD(PyObject *m)
 #endif
 		return -1;
 
+	if (PyType_AddStringConstant(&TYPE, "format", STRUCT_FORMAT))
+		return -1;
+
 #ifndef DOUBLE
 #ifdef SIGNED
 	if (PyType_AddLLConstant(&TYPE, "min", paste(paste(INT, WIDTH), _MIN)))
@@ -236,6 +250,7 @@ static int TYPE_ADD(PyObject *m)
 
 #undef PTYPE
 #undef FORMAT
+#undef STRUCT_FORMAT
 #undef DOCTYPE
 #undef NAME
 #undef LONGNAME
@@ -43,11 +43,12 @@ class _Locking(Struct):
         with self._lock:
             self._value.value = value
 
-    def add(self, amount, raise_on_overflow=True):
+    def add(self, amount, raise_on_overflow=True, relaxed=False):
         """Add 'amount' to the backing atomic.
 
         :param Union[int, float] amount: The amount to add
         :param bool raise_on_overflow: Whether to raise an exception on overflow
+        :param bool relaxed: Ignored, since the lock always orders the addition
         :return: The value from before the addition.
         :rtype: Union[int, float]
         """
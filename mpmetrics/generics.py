@@ -76,12 +76,20 @@ class ObjectType:
         self.__qualname__ = name
         self.__doc__ = cls.__doc__
         setattr(self, '<', self.Module(name + '.<', cls))
+        # Cache of classes we've already looked up, to skip walking their path
+        self._cache = {}
 
     def __getitem__(self, cls):
+        try:
+            return self._cache[cls]
+        except KeyError:
+            pass
+
         parent = getattr(self, '<')
         for subpath in itertools.chain(cls.__module__.split('.'), cls.__qualname__.split('.')):
             parent = getattr(parent, subpath)
-        return getattr(parent, '>')
+        result = self._cache[cls] = getattr(parent, '>')
+        return result
 
 class IntType:
     """Helper for classes polymorphic over integers.
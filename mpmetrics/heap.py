@@ -5,46 +5,68 @@
 
 import itertools
 import mmap
-from multiprocessing.reduction import DupFd
 import os
 from tempfile import TemporaryFile
 import threading
+import weakref
 
 import _mpmetrics
-from .types import Size_t, Struct
-from .util import align, _align_check
-
-SC_LEVEL1_DCACHE_LINESIZE = 190
-try:
-    CACHELINESIZE = os.sysconf(SC_LEVEL1_DCACHE_LINESIZE)
-except OSError:
-    CACHELINESIZE = 64 # Assume 64-byte cache lines
+from .types import Array, Size_t, Struct
+from .util import CACHELINESIZE, make_aligner, _align_check, _align_mask
 
 PAGESIZE = 4096
 
+# Free blocks must be large enough to hold a link
+_MIN_BIN = (Size_t.size - 1).bit_length()
+
 class Heap(Struct):
     """A shared memory allocator.
 
-    This is a basic arena-style allocator. The core algorithm is (effectively)::
+    This is a basic arena-style allocator with segregated free lists. Block
+    sizes are rounded up to the next power of two, and each power of two has
+    its own list of free blocks. The core algorithm is (effectively)::
 
         def malloc(size):
+            bin = log2(size)
+            if free[bin]:
+                return free[bin].pop()
+
             old_base = base
-            base += size
+            base += 2 ** bin
             return old_base
 
-    We do not keep track of free blocks, so :py:meth:`Heap.Block.free` is a no-op.
+        def free(block):
+            if block.start + 2 ** log2(block.size) == base:
+                base = block.start
+            else:
+                free[log2(block.size)].push(block)
+
+    The free lists are stored in shared memory (using the first word of each
+    free block as a link), so blocks free'd in one process can be reused by
+    any other. A free block is only reused if it is suitably aligned.
+    Larger-than-page-size blocks are never free'd.
 
     Memory is requested from the OS in page-sized blocks. As we don't map all
     of our memory up front, it's possible that different processes will map new
     pages at different addresses. Therefore, we keep track of the address where
     each page is mapped, and ensure blocks do not cross page boundaries.
     Larger-than-page-size blocks are supported by aligning the block to the
-    page size and mapping all pages in that block in one go.
+    page size and mapping all pages in that block in one go. The file backing
+    the heap is grown geometrically, so most new pages don't need a syscall
+    until they are first mapped.
+
+    Each process keeps at most one `Heap` object per heap. Unpickling a heap
+    which is already in use by the current process returns the existing
+    object, so objects allocated from the same heap share its maps.
     """
 
     _fields_ = {
         '_shared_lock': _mpmetrics.Lock,
         '_base': Size_t,
+        # Size of the backing file
+        '_file_size': Size_t,
+        # Heads of the free lists, indexed by log2 of the block size
+        '_bins': Array[Size_t, 64],
     }
 
     def __init__(self, map_size=PAGESIZE):
@@ -55,7 +77,7 @@ class Heap(Struct):
 
         if map_size % mmap.ALLOCATIONGRANULARITY:
             raise ValueError("size must be a multiple of {}".format(mmap.ALLOCATIONGRANULARITY))
-        _align_check(map_size)
+        self._align_map = make_aligner(map_size)
         self.map_size = map_size
 
         # File backing our shared memory
@@ -70,22 +92,33 @@ class Heap(Struct):
         self._lock = threading.Lock()
 
         super().__init__(memoryview(self._maps[0])[:self.size])
-        self._base.value = self.size
+        self._base_raw = self.size
+        self._file_size_raw = map_size
+        self._register()
 
-    def __getstate__(self):
-        return self.map_size, DupFd(self._fd)
+    def _register(self):
+        st = os.fstat(self._fd)
+        self._key = st.st_dev, st.st_ino
+        _heaps[self._key] = self
 
-    def __setstate__(self, state):
-        self.map_size, df = state
-        self._fd = df.detach()
-        self._file = open(self._fd, 'a+b')
+    def __reduce__(self):
+        # Only needed when pickling, so don't import multiprocessing otherwise
+        from multiprocessing.reduction import DupFd
+        return _unpickle_heap, (self._key, self.map_size, DupFd(self._fd))
+
+    def _attach(self, map_size, fd):
+        self.map_size = map_size
+        self._align_map = make_aligner(map_size)
+        self._fd = fd
+        self._file = open(fd, 'a+b')
 
         # Process-local shared memory maps
-        self._maps = [mmap.mmap(self._fd, self.map_size)]
+        self._maps = [mmap.mmap(fd, map_size)]
         # Lock for _maps
         self._lock = threading.Lock()
 
         super()._setstate(memoryview(self._maps[0])[:self.size])
+        self._register()
 
     class Block:
         """A block of memory allocated from a Heap."""
@@ -111,25 +144,45 @@ class Heap(Struct):
             Dereference the block, faulting in unmapped pages as necessary.
             """
 
-            heap = self.heap
-            first_page = int(self.start / heap.map_size)
-            last_page = int((self.start + self.size - 1) / heap.map_size)
-            nr_pages = last_page - first_page + 1
-            page_off = first_page * heap.map_size
-            off = self.start - page_off
-            with heap._lock:
-                if len(heap._maps) <= last_page:
-                    heap._maps.extend(itertools.repeat(None, last_page - len(heap._maps) + 1))
-                if not self.heap._maps[first_page]:
-                    heap._maps[first_page] = mmap.mmap(heap._fd, heap.map_size * nr_pages,
-                                                       offset=page_off)
-                map = heap._maps[first_page]
-
-            return memoryview(map)[off:off+self.size]
+            return self.heap.deref(self.start, self.size)
 
         def free(self):
-            """Free this block"""
-            pass
+            """Free this block
+
+            The block must not be used after it is free'd.
+            """
+
+            self.heap._release(self.start, self.size)
+
+    def deref(self, start, size):
+        """Dereference memory in this heap
+
+        :param int start: The offset of the memory within the heap
+        :param int size: The size of the memory
+        :return: The memory
+        :rtype: memoryview
+
+        Like :py:meth:`Heap.Block.deref`, but without creating a
+        :py:class:`Heap.Block`. The memory must have been allocated with
+        :py:meth:`Heap.malloc`.
+        """
+
+        map_size = self.map_size
+        first_page = start // map_size
+        last_page = (start + size - 1) // map_size
+        page_off = first_page * map_size
+        off = start - page_off
+        with self._lock:
+            maps = self._maps
+            if len(maps) <= last_page:
+                maps.extend(itertools.repeat(None, last_page - len(maps) + 1))
+            map = maps[first_page]
+            if not map:
+                nr_pages = last_page - first_page + 1
+                map = mmap.mmap(self._fd, map_size * nr_pages, offset=page_off)
+                maps[first_page] = map
+
+        return memoryview(map)[off:off + size]
 
     def malloc(self, size, alignment=CACHELINESIZE):
         """Allocate shared memory.
@@ -140,22 +193,100 @@ class Heap(Struct):
         :rtype: Block
 
         Allocate at least `size` bytes of shared memory. It will be aligned to
-        at least `alignment`.
+        at least `alignment`, which may be at most the page size.
         """
 
         if size <= 0:
             raise ValueError("size must be strictly positive")
         elif size > self.map_size:
-            size = align(size, self.map_size)
+            size = self._align_map(size)
+            alloc_size = size
+            bin = None
+        else:
+            bin = max((size - 1).bit_length(), _MIN_BIN)
+            alloc_size = 1 << bin
         _align_check(alignment)
+        if alignment > mmap.PAGESIZE:
+            # Pages may be mapped anywhere, so we can't align to more than one
+            raise ValueError(f"alignment {alignment} is larger than a page")
+        mask = alignment - 1
 
         with self._shared_lock:
-            total = align(self._base.value, self.map_size)
-            self._base.value = align(self._base.value, alignment)
-            if self._base.value + size >= total:
-                os.ftruncate(self._fd, align(total + size, self.map_size))
-                self._base.value = total
-            start = self._base.value
-            self._base.value += size
-
+            start = 0
+            if bin is not None:
+                bins = self._bins._view
+                start = bins[bin]
+                if start & mask:
+                    start = 0
+                elif start:
+                    bins[bin], = Size_t._struct.unpack_from(self.deref(start, Size_t.size))
+
+            if not start:
+                base = self._base_raw
+                total = self._align_map(base)
+                base = _align_mask(base, mask)
+                if base + alloc_size >= total:
+                    end = self._align_map(total + alloc_size)
+                    file_size = self._file_size_raw
+                    if end > file_size:
+                        file_size = max(end, 2 * file_size)
+                        os.ftruncate(self._fd, file_size)
+                        self._file_size_raw = file_size
+                    base = total
+                self._base_raw = base + alloc_size
+                return self.Block(self, base, size)
+
+        # Recycled blocks must be zeroed like new ones
+        self.deref(start, alloc_size)[:] = bytes(alloc_size)
         return self.Block(self, start, size)
+
+    def _reset(self):
+        # Free every block at once by discarding the contents of the heap.
+        # This is only meant for testing; any outstanding blocks must not be
+        # used afterwards, and other processes must not be using the heap.
+        map_size = self.map_size
+        with self._lock:
+            del self._maps[1:]
+        with self._shared_lock:
+            os.ftruncate(self._fd, map_size)
+            self._file_size_raw = map_size
+            self.deref(self.size, map_size - self.size)[:] = bytes(map_size - self.size)
+            bins = self._bins._view
+            for bin in range(len(bins)):
+                bins[bin] = 0
+            self._base_raw = self.size
+
+    def _release(self, start, size):
+        if size > self.map_size:
+            return
+
+        bin = max((size - 1).bit_length(), _MIN_BIN)
+        alloc_size = 1 << bin
+        mem = self.deref(start, alloc_size)
+        with self._shared_lock:
+            # Give the most-recently allocated block back to the arena, unless
+            # that would leave the base on a page boundary (which is where
+            # large blocks start).
+            if start + alloc_size == self._base_raw and start % self.map_size:
+                mem[:] = bytes(alloc_size)
+                self._base_raw = start
+                return
+
+            bins = self._bins._view
+            Size_t._struct.pack_into(mem, 0, bins[bin])
+            bins[bin] = start
+
+# Heaps used by this process, keyed by their backing file
+_heaps = weakref.WeakValueDictionary()
+
+def _unpickle_heap(key, map_size, df):
+    fd = df.detach()
+    heap = _heaps.get(key)
+    if heap is not None:
+        # Reuse the heap (and its maps) if we already have it
+        os.close(fd)
+        return heap
+
+    heap = Heap.__new__(Heap)
+    heap._attach(map_size, fd)
+    return heap
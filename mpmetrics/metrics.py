@@ -17,7 +17,7 @@ from prometheus_client import metrics, metrics_core, registry, samples
 import _mpmetrics
 from .atomic import AtomicUInt64, AtomicDouble
 from .generics import IntType
-from .heap import Heap
+from .heap import CACHELINESIZE, Heap
 from .types import Box, Dict, Double, Array, List, Struct, UInt64
 from .util import classproperty, genmask
 
@@ -356,7 +356,7 @@ class Counter(Struct):
 
     def __init__(self, mem, heap, **kwargs):
         super().__init__(mem, heap)
-        self._created.value = time.time()
+        self._created_raw = time.time()
 
     def inc(self, amount=1, exemplar=None):
         """Increment by the given amount."""
@@ -366,23 +366,40 @@ class Counter(Struct):
         if exemplar is not None:
             _validate_exemplar(exemplar)
    
-        self._total.add(amount)
+        # Nothing else is synchronized with the total, so it doesn't need to
+        # be ordered
+        self._total.add(amount, relaxed=True)
         if exemplar is not None:
             with self._lock:
-                self._exemplar_amount.value = amount
-                self._exemplar_timestamp.value = time.time()
-                self._exemplar_labels.clear()
-                self._exemplar_labels |= exemplar
+                self._exemplar_amount_raw = amount
+                self._exemplar_timestamp_raw = time.time()
+                with self._exemplar_labels as labels:
+                    labels.clear()
+                    labels |= exemplar
+
+    def reset(self):
+        """Reset the counter to zero.
+
+        Use this when a logical process restarts without restarting the actual
+        python process.
+        """
+
+        with self._lock:
+            self._total.set(0)
+            self._created_raw = time.time()
+            self._exemplar_amount_raw = 0
+            self._exemplar_timestamp_raw = 0
+            self._exemplar_labels.clear()
 
     def _sample(self, add_sample, name):
         with self._lock:
-            timestamp = self._exemplar_timestamp.value
+            timestamp = self._exemplar_timestamp_raw
             if timestamp:
-                amount = self._exemplar_amount.value
+                amount = self._exemplar_amount_raw
                 labels = self._exemplar_labels.copy()
         add_sample('_total', self._total.get(),
                    exemplar=samples.Exemplar(labels, amount, timestamp) if timestamp else None)
-        add_sample('_created', self._created.value)
+        add_sample('_created', self._created_raw)
 
     @contextmanager
     def count_exceptions(self, exception=Exception):
@@ -494,7 +511,13 @@ class Gauge(Struct):
 
 Gauge = CollectorFactory(Box[Gauge])
 
-class _SummaryData(Struct):
+class _HalfData(Struct):
+    # Summary and Histogram keep their data in two halves: observations go to
+    # the "hot" half while the "cold" half is being collected. Give each half
+    # its own cache line, so that collecting doesn't contend with observing.
+    _align_ = CACHELINESIZE
+
+class _SummaryData(_HalfData):
     _fields_ = {
         'sum': AtomicDouble,
         'count': AtomicUInt64,
@@ -546,7 +569,7 @@ class Summary(Struct):
 
     def __init__(self, mem, **kwargs):
         super().__init__(mem)
-        self._created.value = time.time()
+        self._created_raw = time.time()
 
     def observe(self, amount):
         """Observe the given amount.
@@ -581,7 +604,7 @@ class Summary(Struct):
 
         add_sample('_count', count)
         add_sample('_sum', sum)
-        add_sample('_created', self._created.value)
+        add_sample('_created', self._created_raw)
 
     def time(self):
         """Time a block of code or function, and observe the duration in seconds.
@@ -602,7 +625,7 @@ def _HistogramData(__name__, bucket_count):
 
     ns = locals()
     del ns['bucket_count']
-    return type(__name__, (Struct,), ns)
+    return type(__name__, (_HalfData,), ns)
 
 _HistogramData = IntType('_HistogramData', _HistogramData)
 
@@ -660,14 +683,17 @@ def _Histogram(__name__, bucket_count):
         Struct.__init__(self, mem, heap)
         assert len(thresholds) == bucket_count
         self.thresholds = thresholds
-        for threshold, initial in zip(self._thresholds, thresholds):
-            threshold.value = initial
-            self._exemplars.append(None)
-        self._created.value = time.time()
+        self._le = tuple(str(le) for le in thresholds)
+        view = self._thresholds._view
+        for i, threshold in enumerate(thresholds):
+            view[i] = threshold
+        self._exemplars.extend(itertools.repeat(None, bucket_count))
+        self._created_raw = time.time()
 
     def _setstate(self, mem, heap):
         Struct._setstate(self, mem, heap)
-        self.thresholds = tuple(threshold.value for threshold in self._thresholds)
+        self.thresholds = tuple(self._thresholds._view.tolist())
+        self._le = tuple(str(le) for le in self.thresholds)
 
     def observe(self, amount, exemplar=None):
         """Observe the given amount.
@@ -703,7 +729,13 @@ def _Histogram(__name__, bucket_count):
             while cold.count.get() != count:
                 time.sleep(0)
 
-            buckets = [bucket.get() for bucket in cold.buckets]
+            # All writers to cold have finished, so we can access it in bulk
+            cold_buckets = cold.buckets
+            bulk = hasattr(cold_buckets, '_view')
+            if bulk:
+                buckets = cold_buckets._view.tolist()
+            else:
+                buckets = [bucket.get() for bucket in cold_buckets]
             sum = cold.sum.get()
             exemplars = list(self._exemplars)
 
@@ -712,17 +744,20 @@ def _Histogram(__name__, bucket_count):
             hot.sum.add(sum)
             hot.count.add(count)
 
-            for bucket in cold.buckets:
-                bucket.set(0)
+            if bulk:
+                cold_buckets._clear()
+            else:
+                for bucket in cold_buckets:
+                    bucket.set(0)
             cold.sum.set(0)
             cold.count.set(0)
 
-        for val, le, exemplar in zip(itertools.accumulate(buckets), self.thresholds, exemplars):
-            add_sample('_bucket', val, { 'le': str(le) },
+        for val, le, exemplar in zip(itertools.accumulate(buckets), self._le, exemplars):
+            add_sample('_bucket', val, { 'le': le },
                        samples.Exemplar(*exemplar) if exemplar else None)
         add_sample('_sum', sum)
         add_sample('_count', count)
-        add_sample('_created', self._created.value)
+        add_sample('_created', self._created_raw)
 
     def _time(self):
         """Time a block of code or function, and observe the duration in seconds.
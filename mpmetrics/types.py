@@ -3,18 +3,57 @@
 
 """Various types backed by (shared) memory"""
 
+import copy
 import ctypes
+import functools
 import io
-from multiprocessing.reduction import ForkingPickler
-import pickle
+import operator
+import struct
 import sys
+import types
 
+import _mpmetrics
 from .generics import IntType, ObjectType, ProductType
-from .util import align, classproperty
+from .util import CACHELINESIZE, align, genmask
+
+def _takes_offset(method):
+    # Mark an __init__ or _setstate as taking an offset into mem. Struct and
+    # Array pass such fields their own memory (plus an offset) instead of a
+    # slice of it. This is decided separately for each method, since a
+    # subclass may override only one of them.
+    method._takes_offset = True
+    return method
+
+def _offset_ok(cls, name):
+    method = getattr(cls, name, None)
+    if isinstance(method, (types.WrapperDescriptorType, types.MethodDescriptorType)):
+        # Buffer (and so the atomics and Lock) accepts an offset as well
+        return issubclass(cls, _mpmetrics.Buffer)
+    return getattr(method, '_takes_offset', False)
+
+def _converter(ctype):
+    # Convert values which struct rejects the same way ctypes would: integers
+    # are truncated to the width of ctype, and anything else is a TypeError
+    if ctype._type_ in 'fd':
+        def convert(value):
+            raise TypeError(f"must be real number, not {type(value).__name__}")
+        return convert
+
+    bits = ctypes.sizeof(ctype) * 8
+    mask = genmask(bits - 1, 0)
+    if ctype(-1).value < 0:
+        sign = 1 << (bits - 1)
+        return lambda value: ((operator.index(value) + sign) & mask) - sign
+    return lambda value: operator.index(value) & mask
 
 def _wrap_ctype(__name__, ctype, doc):
     size = ctypes.sizeof(ctype)
     align = ctypes.alignment(ctype)
+    _is_scalar = True
+    _struct = struct.Struct(ctype._type_)
+    convert = _converter(ctype)
+    _convert = staticmethod(convert)
+    __slots__ = ('_mem', '_offset')
 
     __doc__ = f"""{doc.capitalize()} backed by (shared) memory.
 
@@ -45,36 +84,41 @@ def _wrap_ctype(__name__, ctype, doc):
         The alignment of {doc}, in bytes
     """
 
-    def __init__(self, mem, heap=None):
+    @_takes_offset
+    def __init__(self, mem, heap=None, offset=0):
         self._mem = mem
-        self._value = ctype.from_buffer(mem)
-        self._value.value = 0
+        self._offset = offset
+        _struct.pack_into(mem, offset, 0)
 
     __init__.__doc__ = f"""Create a new {__name__}.
 
     :param memoryview mem: The backing memory
     :param heap: Unused
+    :param int offset: The offset of the {__name__} within `mem`
     """
 
-    def _setstate(self, mem, heap=None, **kwargs):
+    @_takes_offset
+    def _setstate(self, mem, heap=None, offset=0, **kwargs):
         self._mem = mem
-        self._value = ctype.from_buffer(mem)
+        self._offset = offset
 
-    def __getattr__(self, name):
-        return getattr(self.__dict__['_value'], name)
+    def _get(self):
+        return _struct.unpack_from(self._mem, self._offset)[0]
 
-    def __setattr__(self, name, value):
-        if '_value' in self.__dict__:
-            setattr(self.__dict__['_value'], name, value)
-        else:
-            self.__dict__[name] = value
+    def _set(self, value):
+        try:
+            _struct.pack_into(self._mem, self._offset, value)
+        except struct.error:
+            _struct.pack_into(self._mem, self._offset, convert(value))
 
-    def __delattr__(self, name):
-        delattr(self.__dict__['_value'], name)
+    value = property(_get, _set)
 
     ns = locals()
     del ns['doc']
     del ns['ctype']
+    del ns['convert']
+    del ns['_get']
+    del ns['_set']
     return type(__name__, (), ns)
 
 Double = _wrap_ctype('Double', ctypes.c_double, "a double")
@@ -82,6 +126,21 @@ Size_t = _wrap_ctype('Size_t', ctypes.c_size_t, "a size_t")
 Int64 = _wrap_ctype('Int64', ctypes.c_int64, "an int64_t")
 UInt64 = _wrap_ctype('UInt64', ctypes.c_uint64, "a uint64_t")
 
+def _raw_property(field, off):
+    st = field._struct
+    convert = field._convert
+
+    def get(self):
+        return st.unpack_from(self._mem, self._offset + off)[0]
+
+    def set(self, value):
+        try:
+            st.pack_into(self._mem, self._offset + off, value)
+        except struct.error:
+            st.pack_into(self._mem, self._offset + off, convert(value))
+
+    return property(get, set)
+
 class Struct:
     """A structured group of fields backed by (shared) memory.
 
@@ -105,50 +164,117 @@ class Struct:
         :classmethod:
         :type: dict[str, Any]
 
-        The fields of the struct, in order. Upon initialization, each value is
-        initialized with a block of memory equal to its `.size`. Padding is
-        added as necessary to ensure alignment.
+        The fields of the struct. Upon initialization, each value is
+        initialized with a block of memory equal to its `.size`. Fields are
+        laid out in order of decreasing alignment (fields with equal alignment
+        keep their order) in order to minimize padding. Padding is added as
+        necessary to ensure alignment.
 
         Subclasses must implement this property.
+
+    .. py:attribute:: size
+        :type: int
+
+        The size of the struct, in bytes. This is computed from `_fields_`
+        when the subclass is created.
+
+    .. py:attribute:: align
+        :type: int
+
+        The alignment of the struct, in bytes. This is computed from
+        `_fields_` when the subclass is created.
+
+    .. py:attribute:: _align_
+        :type: int
+
+        The minimum alignment of the struct, in bytes. Subclasses may set this
+        to (for example) a cache line in order to keep structs in an `Array`
+        from sharing cache lines. `Box` allocates structs with this alignment,
+        so it may be at most the page size.
+
+    For each scalar field (such as a `Double`), an additional ``<name>_raw``
+    property is created. This property reads and writes the value directly
+    from the backing memory, skipping the field object entirely::
+
+        s.a_raw = 1.5
+        assert s.a.value == 1.5
+
+    When a struct is unpickled, its fields are only created when they are
+    first accessed.
     """
 
-    @classmethod
-    def _fields_iter(cls):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not hasattr(cls, '_fields_'):
+            return
+
+        layout = []
         off = 0
-        for name, field in cls._fields_.items():
-            off = align(off, field.align)
-            yield name, field, off
-            off += field.size
-
-    @classproperty
-    def size(cls):
-        """The size of the struct, in bytes"""
-        for name, field, off in cls._fields_iter():
-            size = field.size + off
-        return size
-
-    @classproperty
-    def align(cls):
-        """The alignment of the struct, in bytes"""
-        return max(field.align for field in cls._fields_.values())
-
-    def __init__(self, mem, heap=None):
+        struct_align = getattr(cls, '_align_', 1)
+        # Place the most-aligned fields first to minimize padding
+        fields = sorted(cls._fields_.items(), key=lambda item: -item[1].align)
+        for name, field in fields:
+            field_align = field.align
+            field_size = field.size
+            off = align(off, field_align)
+            layout.append((name, field, off, field_size,
+                           _offset_ok(field, '__init__'), _offset_ok(field, '_setstate')))
+            if getattr(field, '_is_scalar', False):
+                setattr(cls, name + '_raw', _raw_property(field, off))
+            off += field_size
+            struct_align = max(struct_align, field_align)
+
+        cls._layout = tuple(layout)
+        cls._fieldmap = {name: (field, off, size, setstate_offset)
+                         for name, field, off, size, _, setstate_offset in layout}
+        cls.size = off
+        cls.align = struct_align
+
+    @_takes_offset
+    def __init__(self, mem, heap=None, offset=0):
         """Create a new Struct.
 
         :param memoryview mem: The backing memory
         :param mpmetrics.heap.Heap heap: Passed to each field's ``__init__``
+        :param int offset: The offset of the struct within `mem`
+
+        Subclasses which override this method will be passed a slice of their
+        parent's memory (and no `offset`) when used as a field. The same goes
+        for `_setstate`.
         """
 
         self._mem = mem
-        for name, field, off in self._fields_iter():
-            setattr(self, name, field(mem[off:off + field.size], heap=heap))
-
-    def _setstate(self, mem, heap=None, **kwargs):
+        self._offset = offset
+        for name, field, off, size, init_offset, _ in self._layout:
+            off += offset
+            if init_offset:
+                setattr(self, name, field(mem, heap=heap, offset=off))
+            else:
+                setattr(self, name, field(mem[off:off + size], heap=heap))
+
+    @_takes_offset
+    def _setstate(self, mem, heap=None, offset=0, **kwargs):
         self._mem = mem
-        for name, field, off in self._fields_iter():
-            field = field.__new__(field)
-            field._setstate(self._mem[off:off + field.size], heap=heap)
-            setattr(self, name, field)
+        self._offset = offset
+        self._heap = heap
+
+    def __getattr__(self, name):
+        # Fields are created on first access after unpickling
+        try:
+            field, off, size, setstate_offset = self._fieldmap[name]
+            mem = self._mem
+        except (KeyError, AttributeError):
+            raise AttributeError("'{}' object has no attribute '{}'".format(
+                type(self).__name__, name)) from None
+
+        off += self._offset
+        val = field.__new__(field)
+        if setstate_offset:
+            val._setstate(mem, heap=self._heap, offset=off)
+        else:
+            val._setstate(mem[off:off + size], heap=self._heap)
+        setattr(self, name, val)
+        return val
 
 def Array(__name__, cls, n):
     """An array of values backed by (shared) memory.
@@ -164,12 +290,25 @@ def Array(__name__, cls, n):
         a[4].value = 6.28
 
 
-    .. py:method:: Array.__init__(mem, heap=None)
+    .. py:method:: Array.__init__(mem, heap=None, offset=0)
 
         Create a new Array.
 
         :param memoryview mem: The backing memory
         :param mpmetrics.heap.Heap heap: Passed to each member's ``__init__``
+        :param int offset: The offset of the array within `mem`
+
+    Arrays of scalars (such as `Double`) are stored contiguously. Their members
+    are created on first access, and the values themselves can be read in bulk
+    through a typed `memoryview`::
+
+        assert a._view.tolist() == [0.0, 0.0, 0.0, 0.0, 6.28]
+
+    Arrays of atomics (such as :py:class:`_mpmetrics.AtomicUInt64`) also have a
+    read-only `_view`, and can be zeroed all at once with `_clear`. Neither has
+    any memory ordering, so they should only be used when the values are not
+    being concurrently modified.
+    Locking atomics (see :py:mod:`mpmetrics.atomic`) don't have a `_view`.
     """
 
     if n < 1:
@@ -177,35 +316,91 @@ def Array(__name__, cls, n):
 
     member_size = align(cls.size, cls.align)
     size = member_size * n
-
-    def __init__(self, mem, heap=None):
-        self._mem = mem
-        self._vals = []
-        for i in range(n):
-            off = i * member_size
-            self._vals.append(cls(self._mem[off:off + member_size], heap=heap))
-
-    def _setstate(self, mem, heap=None, **kwargs):
-        self._mem = mem
-        self._vals = []
-        for i in range(n):
-            off = i * member_size
-            val = cls.__new__(cls)
-            val._setstate(self._mem[off:off + member_size], heap=heap)
-            self._vals.append(val)
+    offsets = range(0, size, member_size)
+
+    # Atomics may be read in bulk, as long as they are packed
+    view_format = getattr(cls, 'format', None) if member_size == cls.size else None
+    init_offset = _offset_ok(cls, '__init__')
+    setstate_offset = _offset_ok(cls, '_setstate')
+
+    if getattr(cls, '_is_scalar', False):
+        @_takes_offset
+        def __init__(self, mem, heap=None, offset=0):
+            mem[offset:offset + size] = bytes(size)
+            self._setstate(mem, offset=offset)
+
+        @_takes_offset
+        def _setstate(self, mem, heap=None, offset=0, **kwargs):
+            self._mem = mem
+            self._offset = offset
+            self._view = mem[offset:offset + size].cast(cls._struct.format)
+            self._vals = [None] * n
+
+        def _member(self, i):
+            val = self._vals[i]
+            if val is None:
+                val = cls.__new__(cls)
+                val._setstate(self._mem, offset=self._offset + offsets[i])
+                self._vals[i] = val
+            return val
+
+        def __getitem__(self, key):
+            if isinstance(key, slice):
+                return [self._member(i) for i in range(n)[key]]
+            return self._member(key)
+
+        def __iter__(self):
+            return map(self._member, range(n))
+    else:
+        @_takes_offset
+        def __init__(self, mem, heap=None, offset=0):
+            self._mem = mem
+            if init_offset:
+                self._vals = [cls(mem, heap=heap, offset=offset + off) for off in offsets]
+            else:
+                self._vals = [cls(mem[offset + off:offset + off + member_size], heap=heap)
+                              for off in offsets]
+            if view_format:
+                self._bytes = mem[offset:offset + size]
+                self._view = self._bytes.cast(view_format).toreadonly()
+
+        @_takes_offset
+        def _setstate(self, mem, heap=None, offset=0, **kwargs):
+            self._mem = mem
+            vals = []
+            for off in offsets:
+                off += offset
+                val = cls.__new__(cls)
+                if setstate_offset:
+                    val._setstate(mem, heap=heap, offset=off)
+                else:
+                    val._setstate(mem[off:off + member_size], heap=heap)
+                vals.append(val)
+            self._vals = vals
+            if view_format:
+                self._bytes = mem[offset:offset + size]
+                self._view = self._bytes.cast(view_format).toreadonly()
+
+        if view_format:
+            def _clear(self):
+                self._bytes[:] = bytes(size)
+
+        def __getitem__(self, key):
+            return self._vals[key]
+
+        def __iter__(self):
+            return iter(self._vals)
 
     def __len__(self):
         return n
 
-    def __getitem__(self, key):
-        return self._vals[key]
-
-    def __iter__(self):
-        return iter(self._vals)
-
     ns = locals()
     ns['align'] = cls.align
     del ns['member_size']
+    del ns['offsets']
+    del ns['view_format']
+    del ns['init_offset']
+    del ns['setstate_offset']
     del ns['cls']
     del ns['n']
 
@@ -257,69 +452,213 @@ class _Box:
         This method is optional; if it is not implemented then no additional
         keyword arguments will be passed to `_setstate`.
 
-    .. py:method:: Box._setstate(mem, heap=None, **kwargs)
+    .. py:method:: Box._setstate(mem, heap=None, offset=0, **kwargs)
         :abstractmethod:
 
         Initialize internal state after unpickling.
 
         :param memoryview mem: The backing memory
         :param mpmetrics.heap.Heap heap: The heap `mem` was allocated from
+        :param int offset: The offset of the object within `mem`
         :param \**kwargs: Any additional arguments from `_getstate`
 
-        This method must be implemented by boxed types.
+        This method must be implemented by boxed types. When a type is used
+        as a field of a `Struct` or a member of an `Array`, `_setstate` is
+        passed either the memory of its parent along with its offset within it,
+        or (if it is overridden and doesn't take an `offset`) a slice of its
+        parent's memory.
     """
 
     def __init__(self, heap, *args, **kwargs):
-        block = heap.malloc(self.size)
+        block = heap.malloc(self.size, max(self.align, CACHELINESIZE))
         super().__init__(block.deref(), *args, heap=heap, **kwargs)
         self.__block = block
 
     def __getstate__(self):
-        try:
-            kwargs = super()._getstate()
-        except AttributeError:
-            kwargs = {}
-        return self.__block, kwargs
+        if self._has_getstate:
+            return self.__block, super()._getstate()
+        return self.__block, {}
 
     def __setstate__(self, state):
         self.__block, kwargs = state
         super()._setstate(self.__block.deref(), heap=self.__block.heap, **kwargs)
 
-def _create_box(name, cls):
-    return type(name, (_Box, cls), {'__doc__': cls.__doc__})
+    def __copy__(self):
+        # Skip the generic __reduce_ex__ machinery
+        cls = type(self)
+        new = cls.__new__(cls)
+        new.__setstate__(self.__getstate__())
+        return new
 
-_create_box.__doc__ = _Box.__doc__
-Box = ObjectType('Box', _create_box)
+class _ScalarBox:
+    """A box specialized for scalars (such as `Double`)
 
-class _Pickler(ForkingPickler):
-    def __init__(self, file, heap, protocol=None):
-        super().__init__(file, protocol)
-        self.heap = heap
+    Scalars don't take any extra arguments and don't have any state other than
+    their memory, so we only need to keep track of the block.
+    """
 
-    def persistent_id(self, obj):
-        if obj is self.heap:
-            return 'heap'
+    __slots__ = ()
 
-    @classmethod
-    def dumps(cls, obj, heap, protocol=None):
-        buf = io.BytesIO()
-        cls(buf, heap, protocol).dump(obj)
-        return buf.getbuffer()
+    def __init__(self, heap):
+        block = heap.malloc(self.size, max(self.align, CACHELINESIZE))
+        super().__init__(block.deref())
+        self._block = block
 
-class _Unpickler(pickle.Unpickler):
-    def __init__(self, file, heap):
-        super().__init__(file)
-        self.heap = heap
+    def __getstate__(self):
+        return self._block
 
-    def persistent_load(self, pid):
-        if pid != 'heap':
-            raise pickle.UnpicklingError(f"unsupported persistent object {pid}")
-        return self.heap
+    def __setstate__(self, block):
+        self._block = block
+        super()._setstate(block.deref())
+
+    def __copy__(self):
+        cls = type(self)
+        new = cls.__new__(cls)
+        new.__setstate__(self._block)
+        return new
+
+def _create_box(name, cls):
+    if getattr(cls, '_is_scalar', False):
+        return type(name, (_ScalarBox, cls), {
+            '__doc__': cls.__doc__,
+            '__slots__': ('_block',),
+        })
+    return type(name, (_Box, cls), {
+        '__doc__': cls.__doc__,
+        '_has_getstate': hasattr(cls, '_getstate'),
+    })
+
+_create_box.__doc__ = _Box.__doc__
+Box = ObjectType('Box', _create_box)
 
-    @classmethod
-    def loads(cls, data, heap):
-        buf = io.BytesIO(data)
-        return cls(buf, heap).load()
+@functools.cache
+def _picklers():
+    """Return the pickler and unpickler classes used by Object.
+
+    pickle and multiprocessing.reduction are imported on first use. This way,
+    processes which never use an Object (or which are not started by
+    multiprocessing) don't have to pay to import them.
+    """
+
+    from multiprocessing.reduction import ForkingPickler
+    import pickle
+    import threading
+
+    # Creating picklers is relatively expensive, so each thread keeps one
+    # around. It is removed while in use, so re-entrant calls (e.g. from a
+    # __reduce__ method) will create their own.
+    tls = threading.local()
+
+    class _Pickler(ForkingPickler):
+        def __init__(self, file, heap, protocol=pickle.HIGHEST_PROTOCOL, buffer_callback=None):
+            # ForkingPickler.__init__ only passes through positional arguments
+            super().__init__(file, protocol, True, buffer_callback)
+            self.heap = heap
+
+        def persistent_id(self, obj):
+            if obj is self.heap:
+                return 'heap'
+
+        @classmethod
+        def dumps(cls, obj, heap):
+            """Pickle `obj`, returning a list of chunks to be stored back-to-back.
+
+            The first chunk is the pickle stream. If there are any out-of-band
+            buffers, they follow the stream, and are themselves followed by
+            their lengths and then their count (each a size_t).
+
+            The first chunk is a view of a buffer which is reused by the next
+            call from this thread. It should be released once it has been
+            copied.
+            """
+
+            try:
+                buf, buffers, pickler = tls.__dict__.pop('pickler')
+                buf.seek(0)
+                buf.truncate()
+            except (KeyError, BufferError):
+                buf = io.BytesIO()
+                buffers = []
+                pickler = cls(buf, None, buffer_callback=buffers.append)
+
+            try:
+                pickler.heap = heap
+                pickler.dump(obj)
+                chunks = [buf.getbuffer()]
+                if buffers:
+                    raws = [buffer.raw() for buffer in buffers]
+                    chunks.extend(raws)
+                    chunks.append(struct.pack(f'{len(raws) + 1}N', *map(len, raws), len(raws)))
+                return chunks
+            finally:
+                pickler.clear_memo()
+                pickler.heap = None
+                buffers.clear()
+                tls.pickler = buf, buffers, pickler
+
+    def _oob_buffers(data):
+        # This is only started if the stream actually references a buffer, so
+        # streams without out-of-band buffers don't need a trailer.
+        end = len(data) - Size_t._struct.size
+        count, = Size_t._struct.unpack_from(data, end)
+        end -= count * Size_t._struct.size
+        lengths = struct.unpack_from(f'{count}N', data, end)
+        start = end - sum(lengths)
+        for length in lengths:
+            # Copy, since the unpickled object must not alias shared memory
+            yield bytearray(data[start:start + length])
+            start += length
+
+    class _Unpickler(pickle.Unpickler):
+        def __init__(self, file, heap, buffers=None):
+            super().__init__(file, buffers=buffers)
+            self.heap = heap
+
+        def persistent_load(self, pid):
+            if pid != 'heap':
+                raise pickle.UnpicklingError(f"unsupported persistent object {pid}")
+            return self.heap
+
+        @classmethod
+        def loads(cls, data, heap):
+            buf = io.BytesIO(data)
+            return cls(buf, heap, _oob_buffers(data)).load()
+
+    return _Pickler, _Unpickler
+
+def __getattr__(name):
+    if name == '_Pickler':
+        return _picklers()[0]
+    elif name == '_Unpickler':
+        return _picklers()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Indices into Object._hdr, a size_t view of Object's fields. This lets us skip
+# the Size_t wrappers on the hot path. These must match the order of _fields_.
+_START = 0
+_SIZE = 1
+_LEN = 2
+_GEN = 3
+_HDR_FIELDS = ('_start', '_size', '_len', '_gen')
+_HDR_SIZE = len(_HDR_FIELDS) * Size_t.size
+
+_IMMUTABLE_TYPES = frozenset((bool, int, float, complex, str, bytes, type(None)))
+
+def _immutable(v):
+    t = type(v)
+    if t in _IMMUTABLE_TYPES:
+        return True
+    if t is tuple or t is frozenset:
+        return all(map(_immutable, v))
+    return False
+
+def _hdr_offset(cls):
+    # Subclasses may add fields which are laid out before (or after) ours, so
+    # find where our fields ended up, and make sure they are still contiguous
+    offs = [cls._fieldmap[name][1] for name in _HDR_FIELDS]
+    if offs != list(range(offs[0], offs[0] + _HDR_SIZE, Size_t.size)):
+        raise TypeError(f"{', '.join(_HDR_FIELDS)} must be contiguous in {cls.__name__}")
+    return offs[0]
 
 class Object(Struct):
     """A python object pickled in (shared) memory
@@ -329,9 +668,51 @@ class Object(Struct):
     modified, it is pickled to the backing memory.
 
     This class itself does not contain the actual object. Instead, it contains
-    the start/size/length of the block containing the object. When the object
-    grows too large for the block, the old block is free'd and a new one is
-    allocated.
+    the start/size/length of the block containing the object, as well as a
+    generation number which is incremented whenever the object is modified.
+    If the object only contains immutable values (such as `int`, `str`, or
+    `tuple`), then each process keeps the last object it unpickled, and reuses
+    it as long as the generation hasn't changed. Otherwise, the object is
+    unpickled on every access, so values retrieved from it (such as a `list`
+    stored in a `Dict`) can be modified without affecting the object. When the
+    object grows too large for the block, the old block is free'd and a new
+    one is allocated.
+
+    Objects are pickled with the highest protocol available. Any out-of-band
+    buffers (see :pep:`574`) are stored after the pickle stream in the same
+    block. They are copied when unpickling, so the unpickled object never
+    refers to shared memory.
+
+    Subclasses may use a different serialization by overriding `_dumps` and
+    `_loads`. For example, to store a `Dict` as JSON (or with e.g. msgpack)::
+
+        import json
+
+        class JSONDict(Dict):
+            def _dumps(self, v):
+                return [json.dumps(v).encode()]
+
+            def _loads(self, data):
+                return json.loads(bytes(data))
+
+    Several operations can be batched together by using the object as a
+    context manager. Inside the `with` block, the object is only unpickled on
+    first access, and it is only pickled (by :py:meth:`flush`) when the
+    outermost block exits::
+
+        from mpmetrics.heap import Heap
+        from mpmetrics.types import Box, Dict
+
+        d = Box[Dict](Heap())
+        with d:
+            d.clear()
+            d['a'] = 1
+            d['b'] = 2
+
+    Modifications made inside the block are not visible to other processes
+    until it exits, so any lock protecting the object should be held for the
+    entire block. If the block raises an exception, all of its modifications
+    are discarded.
 
     This class provides no synchronization. All methods should be accessed
     under some other form of synchonization, such as a
@@ -342,55 +723,215 @@ class Object(Struct):
         '_start': Size_t,
         '_size': Size_t,
         '_len': Size_t,
+        '_gen': Size_t,
     }
 
-    def __init__(self, mem, heap):
+    # The offset of _start (see _hdr_offset)
+    _hdr_off = 0
+    _cache = None
+    _dirty = False
+    _batch = 0
+    # The last object we unpickled, and its generation
+    _last = None
+    _last_gen = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._hdr_off = _hdr_offset(cls)
+
+    @_takes_offset
+    def __init__(self, mem, heap, offset=0):
         """Create a new Object.
 
         :param memoryview mem: The memory used to store information about the buffer
         :param mpmetrics.heap.Heap heap: The heap to use when (re)allocating the buffer
+        :param int offset: The offset of the information within `mem`
         """
 
         if not heap:
             raise ValueError("heap must be provided")
-        super().__init__(mem)
+        super().__init__(mem, offset=offset)
+        offset += self._hdr_off
+        self._hdr = mem[offset:offset + _HDR_SIZE].cast('N')
         self._heap = heap
 
-    def _setstate(self, mem, heap):
+    @_takes_offset
+    def _setstate(self, mem, heap, offset=0):
         assert heap is not None
-        super()._setstate(mem, heap)
+        super()._setstate(mem, heap, offset)
+        offset += self._hdr_off
+        self._hdr = mem[offset:offset + _HDR_SIZE].cast('N')
         self._heap = heap
 
     @property
     def _block(self):
-        if self._size.value:
-            return self._heap.Block(self._heap, self._start.value, self._size.value)
+        hdr = self._hdr
+        if hdr[_SIZE]:
+            return self._heap.Block(self._heap, hdr[_START], hdr[_SIZE])
 
     @_block.setter
     def _block(self, block):
-        self._start.value = block.start
-        self._size.value = block.size
+        hdr = self._hdr
+        hdr[_START] = block.start
+        hdr[_SIZE] = block.size
+
+    def _deref_object(self):
+        # Like self._block.deref(), but without creating a Block
+        hdr = self._hdr
+        return self._heap.deref(hdr[_START], hdr[_SIZE])
 
     @property
     def _object(self):
-        if self._len.value:
-            return _Unpickler.loads(self._block.deref()[:self._len.value], self._heap)
-        return self._new()
+        v = self._cache
+        if v is not None:
+            return v
+
+        hdr = self._hdr
+        gen = hdr[_GEN]
+        if gen == self._last_gen:
+            v = self._last
+        else:
+            length = hdr[_LEN]
+            if length:
+                v = self._loads(self._deref_object()[:length])
+            else:
+                v = self._new()
+            if self._shareable(v):
+                self._last = v
+                self._last_gen = gen
+
+        if self._batch:
+            self._cache = v
+        return v
 
     @_object.setter
     def _object(self, v):
-        vs = _Pickler.dumps(v, self._heap)
-        new_length = len(vs)
-        self._len.value = new_length
-        if self._len.value > self._size.value:
-            if self._size.value:
-                self._block.free()
-            # Scale by a lot to minimize allocations; Heap doesn't free backing memory
-            self._block = self._heap.malloc(4 * new_length)
-        self._block.deref()[:self._len.value] = vs
+        if self._batch:
+            self._cache = v
+            self._dirty = True
+        else:
+            self._store(v)
+
+    def _shareable(self, v):
+        # Values handed out from a cached object would be shared between
+        # readers, so only cache objects which can't be modified through them
+        return all(map(_immutable, v))
+
+    def _dumps(self, v):
+        """Serialize an object.
+
+        :param v: The object to serialize
+        :return: Chunks of bytes which will be stored back-to-back
+        :rtype: list[bytes-like]
+        """
+
+        pickler, _ = _picklers()
+        return pickler.dumps(v, self._heap)
+
+    def _loads(self, data):
+        """Deserialize an object.
+
+        :param memoryview data: The concatenated chunks from `_dumps`
+        :return: The deserialized object
+
+        `data` refers to shared memory, so it must not be kept.
+        """
+
+        _, unpickler = _picklers()
+        return unpickler.loads(data, self._heap)
+
+    def _store(self, v):
+        chunks = self._dumps(v)
+        hdr = self._hdr
+        new_length = sum(map(len, chunks))
+        if new_length > hdr[_SIZE]:
+            # Grow geometrically so that a growing object is only reallocated
+            # O(log n) times
+            self._realloc(max(2 * hdr[_SIZE], new_length, 64), False)
+        hdr[_LEN] = new_length
+        mem = self._deref_object()
+        off = 0
+        for chunk in chunks:
+            end = off + len(chunk)
+            mem[off:end] = chunk
+            off = end
+        if isinstance(chunks[0], memoryview):
+            # Let the pickler reuse its buffer
+            chunks[0].release()
+
+        # Don't cache v itself; unpickling it may not produce an equal object
+        hdr[_GEN] += 1
+        self._last = None
+        self._last_gen = None
+
+    def _realloc(self, size, copy=True):
+        hdr = self._hdr
+        block = self._heap.malloc(size)
+        if hdr[_SIZE]:
+            if copy and hdr[_LEN]:
+                block.deref()[:hdr[_LEN]] = self._deref_object()[:hdr[_LEN]]
+            self._block.free()
+        self._block = block
+
+    def reserve(self, n):
+        """Reserve space for the pickled object.
+
+        :param int n: The number of bytes to reserve
+
+        Ensure that the object can grow to at least `n` bytes (when pickled)
+        without being reallocated. This is useful before making many
+        modifications.
+        """
+
+        if n > self._hdr[_SIZE]:
+            self._realloc(n)
+
+    def clear(self):
+        """Remove all items from the object.
+
+        This doesn't need to pickle anything, since an empty length means an
+        empty object.
+        """
+
+        if self._batch:
+            self._object = self._new()
+        else:
+            hdr = self._hdr
+            hdr[_LEN] = 0
+            hdr[_GEN] += 1
+
+    def flush(self):
+        """Write back any modifications made inside a `with` block.
+
+        This is called automatically when the outermost `with` block exits
+        (unless it raised an exception).
+        """
+
+        if self._dirty:
+            self._store(self._cache)
+            self._dirty = False
+
+    def __enter__(self):
+        self._batch += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._batch -= 1
+        if not self._batch:
+            try:
+                # Don't publish a partial update
+                if exc[0] is None:
+                    self.flush()
+            finally:
+                self._cache = None
+                self._dirty = False
 
     def _mutate(self, method, *args, **kwargs):
         v = self._object
+        if v is self._last:
+            # Don't modify our cached object, since it may still be in use
+            # (e.g. by an iterator) and the modification may fail
+            v = copy.copy(v)
         result = getattr(v, method)(*args, **kwargs)
         self._object = v
         return result
@@ -398,29 +939,20 @@ class Object(Struct):
     def __repr__(self):
         return f"{self.__class__.__qualname__}({repr(self._object)})"
 
-class Sized:
+class Collection:
     def __len__(self):
         return len(self._object)
 
-class Iterable:
     def __iter__(self):
         return iter(self._object)
 
-class Container:
     def __contains__(self, item):
         return item in self._object
 
-class Collection(Sized, Iterable, Container):
-    pass
-
-class Reversible:
+class Sequence(Collection):
     def __reversed__(self):
         return reversed(self._object)
 
-class Sequence(Reversible, Collection):
-    def __len__(self):
-        return len(self._object)
-
     def __getitem__(self, key):
         return self._object[key]
 
@@ -432,18 +964,14 @@ class Sequence(Reversible, Collection):
 
 class MutableSequence(Sequence):
     def __setitem__(self, key, value):
-        v = self._object
-        v[key] = value
-        self._object = v
+        self._mutate('__setitem__', key, value)
 
     def __delitem__(self, key):
-        v = self._object
-        del v[key]
-        self._object = v
+        self._mutate('__delitem__', key)
 
     def __iadd__(self, other):
-        self._object = self._object + other
-        return self._object
+        self._mutate('__iadd__', other)
+        return self
 
     def insert(self, index, object):
         self._mutate('insert', index, object)
@@ -487,17 +1015,10 @@ class Mapping(Collection):
 
 class MutableMapping(Mapping):
     def __setitem__(self, key, value):
-        v = self._object
-        v[key] = value
-        self._object = v
+        self._mutate('__setitem__', key, value)
 
     def __delitem__(self, key):
-        v = self._object
-        del v[key]
-        self._object = v
-
-    def clear(self):
-        self._len.value = 0
+        self._mutate('__delitem__', key)
 
     def pop(self, key, default=None):
         return self._mutate('pop', key, default)
@@ -520,6 +1041,10 @@ class Dict(Object, Sequence, MutableMapping):
 
     _new = dict
 
+    def _shareable(self, v):
+        # Check the keys as well as the values
+        return all(map(_immutable, v.items()))
+
     def __or__(self, other):
         return self._object | other
 
@@ -528,7 +1053,8 @@ class Dict(Object, Sequence, MutableMapping):
         return self
 
     def copy(self):
-        return self._object
+        # Don't hand out our cached object
+        return self._object.copy()
 
 class List(Object, MutableSequence):
     """A `list` backed by (shared) memory.
@@ -3,6 +3,14 @@
 
 """Various small utilities."""
 
+import os
+
+SC_LEVEL1_DCACHE_LINESIZE = 190
+try:
+    CACHELINESIZE = os.sysconf(SC_LEVEL1_DCACHE_LINESIZE)
+except OSError:
+    CACHELINESIZE = 64 # Assume 64-byte cache lines
+
 def _align_mask(x, mask):
     return (x + mask) & ~mask
 
@@ -34,6 +42,21 @@ def align_down(x, a):
     _align_check(a)
     return x & ~(a - 1)
 
+def make_aligner(a):
+    """Make a function which aligns its argument to `a`
+
+    :param int a: The alignment; must be a power of two
+    :return: A function equivalent to ``lambda x: align(x, a)``
+    :rtype: Callable[[int], int]
+
+    This is useful when aligning many values to the same alignment, since `a`
+    is only checked once.
+    """
+
+    _align_check(a)
+    mask = a - 1
+    return lambda x: (x + mask) & ~mask
+
 def genmask(hi, lo):
     """Generate a mask with bits between `hi` `lo` set.
 
@@ -53,6 +76,17 @@ def genmask(hi, lo):
 
     return (-1 << lo) & ~(-1 << (hi + 1))
 
+# The C versions of these functions (below) fall back to these for values
+# which don't fit in a long long
+_py_align = align
+_py_align_down = align_down
+_py_genmask = genmask
+
+try:
+    from _mpmetrics import align, align_down, genmask
+except ImportError:
+    pass
+
 # From https://stackoverflow.com/a/7864317/5086505
 class classproperty(property):
     """Like `property` but for classes."""
@@ -29,7 +29,7 @@ setuptools.setup(
     ext_modules = [
         setuptools.Extension(
             '_mpmetrics',
-            ['_mpmetrics.c', 'atomic.c', 'lock.c'],
+            ['_mpmetrics.c', 'atomic.c', 'lock.c', 'util.c'],
         ),
     ],
     license = 'LGPL-3.0-only',
@@ -58,6 +58,13 @@ def test_uadd(heap, x, y):
         a.add(y)
         assert a.get() == x + y
 
+@pytest.mark.parametrize('relaxed', (False, True))
+def test_relaxed(heap, atomic, relaxed):
+    a = atomic(heap)
+    a.set(1)
+    assert a.add(2, relaxed=relaxed) == 1
+    assert a.get() == 3
+
 @given(x=st.floats())
 def test_dset(heap, x):
     a = Box[AtomicDouble](heap)
@@ -3,6 +3,7 @@
 
 from collections import namedtuple
 import multiprocessing
+import os
 import queue
 import sys
 import threading
@@ -27,6 +28,10 @@ for method in ('fork', 'forkserver', 'spawn'):
 
     try:
         context = multiprocessing.get_context(method)
+        if method == 'forkserver':
+            # Import everything once in the server, instead of in every child
+            context.set_forkserver_preload(['mpmetrics', 'mpmetrics.heap',
+                                            'mpmetrics.metrics', __name__])
         parallels[method] = Parallel(
             spawn = context.Process,
             barrier = context.Barrier,
@@ -39,6 +44,24 @@ for method in ('fork', 'forkserver', 'spawn'):
 def parallel(request):
     return parallels[request.param]
 
+def physical_cpus():
+    """Return one CPU for each physical core we are allowed to run on"""
+    if not hasattr(os, 'sched_getaffinity'):
+        return []
+
+    cpus = []
+    cores = set()
+    for cpu in sorted(os.sched_getaffinity(0)):
+        try:
+            with open(f'/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list') as f:
+                core = f.read().strip()
+        except OSError:
+            core = cpu
+        if core not in cores:
+            cores.add(core)
+            cpus.append(cpu)
+    return cpus
+
 class ParallelLoop:
     def __init__(self, parallel, n=4, count=None):
         self.parallel = parallel
@@ -53,7 +76,16 @@ class ParallelLoop:
         self.total = n * count
         self.barrier = self.parallel.barrier(self.n + 1)
 
+        # Pin each worker to its own physical core for repeatable contention.
+        # Don't bother if we would have to double up.
+        cpus = physical_cpus()
+        self.cpus = cpus if len(cpus) >= n else None
+
     def target(self, n):
+        if self.cpus:
+            # For threads, this only affects the calling thread
+            os.sched_setaffinity(0, (self.cpus[n],))
+
         if hasattr(self, 'setup'):
             try:
                 self.setup(n)
@@ -61,9 +93,10 @@ class ParallelLoop:
                 self.barrier.abort()
                 raise
 
+        loop = self.loop
         self.barrier.wait()
         for i in range(self.count):
-            self.loop(i)
+            loop(i)
 
     def run(self):
         procs = [self.parallel.spawn(target=self.target, args=(i,)) for i in range(self.n)]
@@ -0,0 +1,19 @@
+# SPDX-License-Identifier: GPL-3.0-only
+# Copyright (C) 2022 Sean Anderson <seanga2@gmail.com>
+
+import pytest
+
+def pytest_addoption(parser):
+    parser.addoption('--run-slow', action='store_true', help="run slow tests")
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', "slow: skipped unless --run-slow is passed")
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--run-slow'):
+        return
+
+    skip = pytest.mark.skip(reason="needs --run-slow")
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip)
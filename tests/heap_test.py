@@ -1,8 +1,11 @@
 # SPDX-License-Identifier: GPL-3.0-only
 # Copyright (C) 2022 Sean Anderson <seanga2@gmail.com>
 
-import math
+import ctypes
+import functools
 import mmap
+import os
+import pickle
 
 import pytest
 from hypothesis import given, HealthCheck, settings, strategies as st
@@ -22,15 +25,19 @@ def test_small_size(size):
     with pytest.raises(ValueError):
         Heap().malloc(size)
 
-@given(st.integers().filter(lambda a: a <= 0 or math.log2(a) % 1))
+@given(st.integers().filter(lambda a: a <= 0 or a & (a - 1)))
 def test_bad_align(alignment):
     with pytest.raises(ValueError):
         Heap().malloc(1, alignment)
 
+@functools.lru_cache
+def sized_heap(map_size):
+    return Heap(map_size=map_size)
+
 @st.composite
 def allocs(draw):
     size = mmap.ALLOCATIONGRANULARITY << draw(st.integers(0, 4))
-    heap = Heap(map_size=size)
+    heap = sized_heap(size)
     sizes = st.integers(1, 2 * size)
     aligns = st.integers(0, 12).map(lambda n: 1 << n)
     return heap, draw(st.lists(st.tuples(sizes, aligns), min_size=3))
@@ -39,6 +46,7 @@ def allocs(draw):
 @settings(max_examples=25, suppress_health_check=(HealthCheck.data_too_large,))
 def test_malloc(alloc):
     h, paramlist = alloc
+    h._reset()
 
     blocks = [h.malloc(*params) for params in paramlist]
     for ((size, alignment), block) in zip(paramlist, blocks):
@@ -54,8 +62,9 @@ def test_malloc(alloc):
             assert len(mem) == block.size
         else:
             assert len(mem) >= block.size
-        assert not any(mem)
-        mem[:] = b'A' * len(mem)
+        assert bytes(mem) == bytes(len(mem))
+        # Fill the block in place, without creating a block-sized bytes
+        ctypes.memset((ctypes.c_char * len(mem)).from_buffer(mem), ord('A'), len(mem))
 
     blocks.sort(key=lambda block: block.start)
     for i in range(len(blocks)):
@@ -63,6 +72,53 @@ def test_malloc(alloc):
             prev = blocks[i - 1]
             assert prev.start + prev.size <= blocks[i].start
 
+def test_free():
+    h = Heap()
+    a = h.malloc(100)
+    b = h.malloc(100)
+    # Keep b from being the last block
+    h.malloc(100)
+    a.deref()[:] = b'A' * 100
+    a.free()
+
+    c = h.malloc(120)
+    assert c.start == a.start
+    assert c.size == 120
+    assert not any(c.deref())
+
+    # Blocks are only reused if they are in the same bin and suitably aligned
+    b.free()
+    assert h.malloc(200).start != b.start
+    assert h.malloc(65, (b.start & -b.start) << 1).start != b.start
+    assert h.malloc(65).start == b.start
+
+def test_free_last():
+    h = Heap()
+    h.malloc(100)
+    a = h.malloc(100)
+    a.deref()[:] = b'A' * 100
+    a.free()
+
+    # The last block is returned to the arena, so it can be reused for any size
+    b = h.malloc(200)
+    assert b.start == a.start
+    assert not any(b.deref())
+
+def test_pickle():
+    h = Heap()
+    block = pickle.loads(pickle.dumps(h.malloc(1)))
+    assert block.heap is h
+    assert pickle.loads(pickle.dumps(h)) is h
+
+def test_grow():
+    h = Heap()
+    sizes = set()
+    for _ in range(16):
+        h.malloc(h.map_size // 2)
+        sizes.add(os.fstat(h._fd).st_size)
+    # The file should be grown geometrically
+    assert len(sizes) <= 5
+
 def set_pre(block, val):
     block.deref()[0] = val
 
@@ -56,14 +56,14 @@ def test_acquire(heap, parallel):
         b.wait()
 
         assert not l.acquire(block=False)
-        now = time.time()
+        now = time.monotonic_ns()
         try:
             assert not l.acquire(timeout=0.001)
         except OSError as e:
             if e.errno != errno.ENOTSUP:
                 raise
         else:
-            assert now + 0.001 <= time.time()
+            assert now + 1_000_000 <= time.monotonic_ns()
 
         b.wait()
         with l:
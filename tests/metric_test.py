@@ -62,10 +62,31 @@ def get_sample_exemplar(collector, name, labels={}):
                 return s.exemplar
     return None
 
+class Snapshot:
+    """Collect samples once, and look up values and exemplars like get_sample_*"""
+    def __init__(self, collector):
+        self.samples = {}
+        for metric in collector.collect():
+            for s in metric.samples:
+                self.samples.setdefault((s.name, frozenset(s.labels.items())), s)
+
+    def value(self, name, labels={}):
+        s = self.samples.get((name, frozenset(labels.items())))
+        return s.value if s else None
+
+    def exemplar(self, name, labels={}):
+        s = self.samples.get((name, frozenset(labels.items())))
+        return s.exemplar if s else None
+
+@pytest.fixture(scope='module')
+def shared_counter(registry):
+    return Counter('c_total', "help", registry=registry)
+
 class TestCounter:
     @pytest.fixture
-    def counter(self, registry):
-        return Counter('c_total', "help", registry=registry)
+    def counter(self, shared_counter):
+        shared_counter.reset()
+        return shared_counter
 
     def test_increment(self, counter):
         assert get_sample_value(counter, 'c_created')
@@ -83,6 +104,14 @@ class TestCounter:
         with pytest.raises(OverflowError):
             counter.inc(AtomicUInt64.max)
 
+    def test_reset(self, counter):
+        created = get_sample_value(counter, 'c_created')
+        counter.inc(7, {'foo': 'bar'})
+        counter.reset()
+        assert get_sample_value(counter, 'c_total') == 0
+        assert get_sample_value(counter, 'c_created') >= created
+        assert get_sample_exemplar(counter, 'c_total') is None
+
     @given(st.integers(max_value=-1))
     def test_negative_increment_raises(self, registry, amount):
         counter = Counter('c_total', "help", registry=registry)
@@ -216,44 +245,48 @@ class TestHistogram:
         return Histogram('h', 'help', ['l'], registry=registry)
 
     def test_histogram(self, histogram):
-        assert get_sample_value(histogram, 'h_created')
-        assert get_sample_value(histogram, 'h_bucket', {'le': '1.0'}) == 0
-        assert get_sample_value(histogram, 'h_bucket', {'le': '2.5'}) == 0
-        assert get_sample_value(histogram, 'h_bucket', {'le': '5.0'}) == 0
-        assert get_sample_value(histogram, 'h_bucket', {'le': 'inf'}) == 0
-        assert get_sample_value(histogram, 'h_count') == 0
-        assert get_sample_value(histogram, 'h_sum') == 0
+        snap = Snapshot(histogram)
+        assert snap.value('h_created')
+        assert snap.value('h_bucket', {'le': '1.0'}) == 0
+        assert snap.value('h_bucket', {'le': '2.5'}) == 0
+        assert snap.value('h_bucket', {'le': '5.0'}) == 0
+        assert snap.value('h_bucket', {'le': 'inf'}) == 0
+        assert snap.value('h_count') == 0
+        assert snap.value('h_sum') == 0
         for le in ('1.0', '2.5', '5.0', 'inf'):
-            assert get_sample_exemplar(histogram, 'h_bucket', {'le': le}) is None
+            assert snap.exemplar('h_bucket', {'le': le}) is None
 
         histogram.observe(2, {'foo': 'bar'})
-        assert get_sample_value(histogram, 'h_bucket', {'le': '1.0'}) == 0
-        assert get_sample_value(histogram, 'h_bucket', {'le': '2.5'}) == 1
-        assert get_sample_value(histogram, 'h_bucket', {'le': '5.0'}) == 1
-        assert get_sample_value(histogram, 'h_bucket', {'le': 'inf'}) == 1
-        assert get_sample_value(histogram, 'h_count') == 1
-        assert get_sample_value(histogram, 'h_sum') == 2
-        exemplar = get_sample_exemplar(histogram, 'h_bucket', {'le': '2.5'})
+        snap = Snapshot(histogram)
+        assert snap.value('h_bucket', {'le': '1.0'}) == 0
+        assert snap.value('h_bucket', {'le': '2.5'}) == 1
+        assert snap.value('h_bucket', {'le': '5.0'}) == 1
+        assert snap.value('h_bucket', {'le': 'inf'}) == 1
+        assert snap.value('h_count') == 1
+        assert snap.value('h_sum') == 2
+        exemplar = snap.exemplar('h_bucket', {'le': '2.5'})
         assert exemplar.labels == {'foo': 'bar'}
         assert exemplar.value == 2
         assert exemplar.timestamp
 
         histogram.observe(2.5, {'foo': 'baz'})
-        assert get_sample_value(histogram, 'h_bucket', {'le': '1.0'}) == 0
-        assert get_sample_value(histogram, 'h_bucket', {'le': '2.5'}) == 2
-        assert get_sample_value(histogram, 'h_bucket', {'le': '5.0'}) == 2
-        assert get_sample_value(histogram, 'h_bucket', {'le': 'inf'}) == 2
-        assert get_sample_value(histogram, 'h_count') == 2
-        assert get_sample_value(histogram, 'h_sum') == 4.5
-        assert get_sample_exemplar(histogram, 'h_bucket', {'le': '2.5'}).labels['foo'] == 'baz'
+        snap = Snapshot(histogram)
+        assert snap.value('h_bucket', {'le': '1.0'}) == 0
+        assert snap.value('h_bucket', {'le': '2.5'}) == 2
+        assert snap.value('h_bucket', {'le': '5.0'}) == 2
+        assert snap.value('h_bucket', {'le': 'inf'}) == 2
+        assert snap.value('h_count') == 2
+        assert snap.value('h_sum') == 4.5
+        assert snap.exemplar('h_bucket', {'le': '2.5'}).labels['foo'] == 'baz'
 
         histogram.observe(float("inf"))
-        assert get_sample_value(histogram, 'h_bucket', {'le': '1.0'}) == 0
-        assert get_sample_value(histogram, 'h_bucket', {'le': '2.5'}) == 2
-        assert get_sample_value(histogram, 'h_bucket', {'le': '5.0'}) == 2
-        assert get_sample_value(histogram, 'h_bucket', {'le': 'inf'}) == 3
-        assert get_sample_value(histogram, 'h_count') == 3
-        assert get_sample_value(histogram, 'h_sum') == float("inf")
+        snap = Snapshot(histogram)
+        assert snap.value('h_bucket', {'le': '1.0'}) == 0
+        assert snap.value('h_bucket', {'le': '2.5'}) == 2
+        assert snap.value('h_bucket', {'le': '5.0'}) == 2
+        assert snap.value('h_bucket', {'le': 'inf'}) == 3
+        assert snap.value('h_count') == 3
+        assert snap.value('h_sum') == float("inf")
 
     def test_setting_buckets(self, registry):
         def get_buckets(h):
@@ -296,6 +329,8 @@ class TestHistogram:
         def __init__(self, histogram, parallel):
             super().__init__(parallel)
             self.histogram = histogram
+            # Only observe finite values, so the sum can be checked
+            self.thresholds = histogram.thresholds[:-1]
 
         def get_sample(self):
             metric = next(self.histogram.collect())
@@ -310,7 +345,7 @@ class TestHistogram:
             return buckets, sum, count
 
         def loop(self, n):
-            self.histogram.observe(random.choice(self.histogram.thresholds[:-1]))
+            self.histogram.observe(random.choice(self.thresholds))
 
         def check(self):
             buckets, sum, count = self.get_sample()
@@ -1,16 +1,26 @@
 # SPDX-License-Identifier: GPL-3.0-only
 # Copyright (C) 2022 Sean Anderson <seanga2@gmail.com>
 
+import copy
+import ctypes
+import functools
+import json
+import mmap
 import pickle
+import random
+import string
+import subprocess
+import sys
 
-from hypothesis import assume, given, reject, settings, strategies as st
+from hypothesis import assume, given, settings, strategies as st
 from hypothesis.stateful import Bundle, multiple, RuleBasedStateMachine, rule
 import pytest
 
 from mpmetrics.atomic import AtomicInt64, AtomicUInt64, AtomicDouble
 from mpmetrics.generics import ObjectType, ListType
 from mpmetrics.heap import PAGESIZE, Heap
-from mpmetrics.types import Array, Box, Dict, Double, List, Size_t, Struct
+from mpmetrics.types import Array, Box, Dict, Double, Int64, List, Object, Size_t, Struct
+import _mpmetrics
 from _mpmetrics import Lock
 
 from .common import heap
@@ -21,36 +31,64 @@ def GenericStruct(__name__, classes):
 
 GenericStruct = ListType('GenericStruct', GenericStruct, ObjectType) 
 
-def recursive_types(classes):
-    @st.composite
-    def arrays(draw):
-        array = Array[draw(classes), draw(st.integers(1, 8))]
-        # reject too-large types as soon as we can
-        if array.size >= PAGESIZE:
-            reject()
-        return array
-
-    @st.composite
-    def structs(draw):
-        n = draw(st.integers(1, 8))
-        struct = GenericStruct[draw(st.tuples(*((classes,) * n)))]
-        # ditto
-        if struct.size >= PAGESIZE:
-            reject()
-        return struct
-
-    return arrays() | structs()
-
-base_types = st.sampled_from((AtomicInt64, AtomicUInt64, AtomicDouble, Double, Size_t, Lock))
-types = st.recursive(base_types, recursive_types)
+base_types = (AtomicInt64, AtomicUInt64, AtomicDouble, Double, Size_t, Lock)
+
+# Looking up a specialization walks a chain of attributes, so skip it for
+# types we've already built
+
+@functools.cache
+def array_type(cls, n):
+    return Array[cls, n]
+
+@functools.cache
+def struct_type(classes):
+    return GenericStruct[classes]
+
+def random_type(rng, depth=3):
+    """Return a random type, or None if it would be too large"""
+    if not depth or rng.random() < 0.3:
+        return rng.choice(base_types)
+    if rng.random() < 0.5:
+        cls = random_type(rng, depth - 1)
+        if cls is None:
+            return None
+        cls = array_type(cls, rng.randint(1, 8))
+    else:
+        classes = tuple(random_type(rng, depth - 1) for _ in range(rng.randint(1, 8)))
+        if None in classes:
+            return None
+        cls = struct_type(classes)
+    return cls if cls.size < PAGESIZE else None
+
+def type_pool(n, seed=0):
+    # Building types is slow, so draw from a fixed pool instead of having
+    # Hypothesis construct new ones for every example
+    rng = random.Random(seed)
+    pool = list(base_types)
+    while len(pool) < n:
+        cls = random_type(rng)
+        if cls is not None:
+            pool.append(cls)
+    return pool
+
+types = st.sampled_from(type_pool(200))
+
+# Specializations are cached, so the same class is often drawn more than once
+pickled_classes = set()
+# Pickling doesn't modify boxes, so reuse them (from the session heap)
+pickled_boxes = {}
 
 @given(types)
 @settings(max_examples=25)
 def test_pickle(heap, cls):
-    pickle.loads(pickle.dumps(cls))
+    if cls not in pickled_classes:
+        assert pickle.loads(pickle.dumps(cls)) is cls
+        pickled_classes.add(cls)
 
     assume(cls.size <= heap.map_size)
-    v = Box[cls](heap)
+    v = pickled_boxes.get(cls)
+    if v is None:
+        v = pickled_boxes[cls] = Box[cls](heap)
     pickle.loads(pickle.dumps(v))
 
 # We use Size_t because drawing from types is slow
@@ -63,27 +101,457 @@ def test_array(heap, n):
     a = Box[A](heap)
     assert len(a) == n
 
+def test_scalar_array(heap):
+    a = Box[Array[Double, 4]](heap)
+    a[1].value = 1.5
+    a[-1].value = 3.5
+    assert a._view.tolist() == [0, 1.5, 0, 3.5]
+    assert [d.value for d in a[1::2]] == [1.5, 3.5]
+    with pytest.raises(IndexError):
+        a[4]
+
+    a = pickle.loads(pickle.dumps(a))
+    assert [d.value for d in a] == [0, 1.5, 0, 3.5]
+
+def test_atomic_view(heap):
+    a = Box[Array[AtomicUInt64, 3]](heap)
+    a[1].add(5)
+    a[2].set(7)
+    if AtomicUInt64 is _mpmetrics.AtomicUInt64:
+        assert a._view.tolist() == [0, 5, 7]
+        assert a._view.readonly
+        a = pickle.loads(pickle.dumps(a))
+        assert a._view.tolist() == [0, 5, 7]
+        a._clear()
+        assert [v.get() for v in a] == [0, 0, 0]
+    else:
+        assert not hasattr(a, '_view')
+
+class Byte:
+    size = 1
+    align = 1
+
+    def __init__(self, mem, heap=None):
+        assert len(mem) == 1
+
+class PackedStruct(Struct):
+    _fields_ = {
+        'a': Byte,
+        'b': Double,
+        'c': Byte,
+    }
+
+def test_packing(heap):
+    assert PackedStruct.size == Double.size + 2
+    assert [layout[2] for layout in PackedStruct._layout] == [0, 8, 9]
+    Box[PackedStruct](heap)
+
+    # Keep Objects within a cache line
+    assert Object.size <= 64
+
+def test_copy(heap):
+    d = Box[Double](heap)
+    c = copy.copy(d)
+    d.value = 1.5
+    assert c.value == 1.5
+
+    s = Box[NestedStruct](heap)
+    c = copy.copy(s)
+    s.a.value = 3
+    assert c.a.value == 3
+
+class AlignedStruct(Struct):
+    _align_ = 64
+    _fields_ = {
+        'a': Double,
+    }
+
+def test_align():
+    assert AlignedStruct.align == 64
+    assert Array[AlignedStruct, 2].size == 128
+
+class LineAlignedStruct(Struct):
+    _align_ = 256
+    _fields_ = AlignedStruct._fields_
+
+class PageAlignedStruct(Struct):
+    _align_ = mmap.PAGESIZE
+    _fields_ = AlignedStruct._fields_
+
+class OverAlignedStruct(Struct):
+    _align_ = 2 * mmap.PAGESIZE
+    _fields_ = AlignedStruct._fields_
+
+@pytest.mark.parametrize('cls', (LineAlignedStruct, PageAlignedStruct, OverAlignedStruct))
+def test_box_align(heap, cls):
+    # Make sure the heap's base isn't already aligned
+    Box[Double](heap)
+    if cls.align > mmap.PAGESIZE:
+        with pytest.raises(ValueError):
+            Box[cls](heap)
+    else:
+        s = Box[cls](heap)
+        assert ctypes.addressof(ctypes.c_char.from_buffer(s._mem)) % cls.align == 0
+
+class AlignedDict(Dict):
+    _fields_ = Dict._fields_ | { 'extra': AlignedStruct }
+
+class OddDict(Dict):
+    _fields_ = Dict._fields_ | { 'extra': Byte }
+
+class AlignedList(List):
+    _fields_ = List._fields_ | { 'extra': AlignedStruct }
+
+class OddList(List):
+    _fields_ = List._fields_ | { 'extra': Byte }
+
+@pytest.mark.parametrize('D,L', ((AlignedDict, AlignedList), (OddDict, OddList)))
+def test_object_fields(heap, D, L):
+    d = Box[D](heap)
+    d['a'] = 1
+    assert d._len.value == d._hdr[2] > 0
+    assert pickle.loads(pickle.dumps(d)) == { 'a': 1 }
+
+    l = Box[L](heap)
+    l.append(1)
+    assert l._len.value == l._hdr[2] > 0
+    assert list(pickle.loads(pickle.dumps(l))) == [1]
+
+def test_object_layout():
+    # The extra field is laid out first
+    assert AlignedDict._hdr_off == AlignedStruct.size
+
+    with pytest.raises(TypeError):
+        class SplitDict(Dict):
+            _fields_ = {
+                '_start': Size_t,
+                '_size': Size_t,
+                'extra': Size_t,
+                '_len': Size_t,
+                '_gen': Size_t,
+            }
+
+class RawStruct(Struct):
+    _fields_ = {
+        'a': Double,
+        'b': Lock,
+        'c': Size_t,
+    }
+
+def test_raw(heap):
+    s = Box[RawStruct](heap)
+    assert not hasattr(s, 'b_raw')
+
+    s.a_raw = 1.5
+    assert s.a.value == 1.5
+    s.c.value = 7
+    assert s.c_raw == 7
+
+    s = pickle.loads(pickle.dumps(s))
+    assert s.a_raw == 1.5
+    assert s.c_raw == 7
+
+def test_scalar_values(heap):
+    # Out-of-range integers wrap like they do with ctypes
+    s = Box[Size_t](heap)
+    s.value = -1
+    assert s.value == 2 ** 64 - 1
+    s.value = 2 ** 64
+    assert s.value == 0
+
+    i = Box[Int64](heap)
+    i.value = 2 ** 63
+    assert i.value == -2 ** 63
+
+    r = Box[RawStruct](heap)
+    r.c_raw = -1
+    assert r.c.value == 2 ** 64 - 1
+
+    d = Box[Double](heap)
+    d.value = 2 ** 64
+    assert d.value == 2.0 ** 64
+
+    for var, value in ((s, 1.5), (s, None), (d, 'x')):
+        with pytest.raises(TypeError):
+            var.value = value
+
+    with pytest.raises(TypeError):
+        r.a_raw = None
+
+class NestedStruct(Struct):
+    _fields_ = {
+        'a': Size_t,
+        'b': Array[Double, 4],
+        'c': AtomicInt64,
+        'd': RawStruct,
+    }
+
+def test_nested(heap):
+    s = Box[NestedStruct](heap)
+    s.a.value = 1
+    for i, d in enumerate(s.b):
+        d.value = i + 0.5
+    s.c.set(-3)
+    s.d.a.value = 2.5
+    s.d.c.value = 4
+
+    s = pickle.loads(pickle.dumps(s))
+    assert 'a' not in vars(s)
+    assert s.a is s.a
+    assert s.a.value == 1
+    assert [d.value for d in s.b] == [0.5, 1.5, 2.5, 3.5]
+    assert s.c.get() == -3
+    assert s.d.a_raw == 2.5
+    assert s.d.c.value == 4
+
+class Legacy:
+    size = 8
+    align = 8
+
+    def __init__(self, mem, heap=None):
+        self._mem = mem
+
+    def _setstate(self, mem, heap=None, **kwargs):
+        self._mem = mem
+
+class LegacyStruct(Struct):
+    _fields_ = {
+        'a': Double,
+        'b': Legacy,
+        'c': Array[Legacy, 2],
+    }
+
+def test_legacy_setstate(heap):
+    # Fields which don't take an offset get a slice of their parent's memory
+    s = Box[LegacyStruct](heap)
+    s.b._mem[:] = b'LEGACY!!'
+    s.c[1]._mem[:] = b'ARRAY!!!'
+
+    s = pickle.loads(pickle.dumps(s))
+    assert bytes(s.b._mem) == b'LEGACY!!'
+    assert bytes(s.c[1]._mem) == b'ARRAY!!!'
+
+class LegacySetstateStruct(Struct):
+    _fields_ = {
+        'a': Size_t,
+        'b': Size_t,
+    }
+
+    def _setstate(self, mem, heap=None, **kwargs):
+        Struct._setstate(self, mem, heap)
+        self.restored = True
+
+class LegacySetstateParent(Struct):
+    _fields_ = {
+        'a': Double,
+        'b': LegacySetstateStruct,
+        'c': Array[LegacySetstateStruct, 2],
+    }
+
+def test_legacy_setstate_only(heap):
+    # Overriding only _setstate still gets a slice when unpickling
+    s = Box[LegacySetstateParent](heap)
+    s.a.value = 1.5
+    s.b.a.value = 2
+    s.b.b.value = 3
+    s.c[1].b.value = 4
+
+    s = pickle.loads(pickle.dumps(s))
+    assert s.b.restored
+    assert s.a.value == 1.5
+    assert (s.b.a.value, s.b.b.value) == (2, 3)
+    assert s.c[1].restored
+    assert (s.c[0].b.value, s.c[1].b.value) == (0, 4)
+
+def test_lazy_pickle():
+    # Run in a new interpreter, since we've already imported pickle
+    subprocess.run((sys.executable, '-c', """if True:
+        import sys
+        from mpmetrics import Counter
+        from mpmetrics.heap import Heap
+        from mpmetrics.types import Box, Dict
+
+        Counter('c', 'help').inc()
+        d = Box[Dict](Heap())
+        assert 'pickle' not in sys.modules
+        assert 'multiprocessing.reduction' not in sys.modules
+
+        d['x'] = 'y'
+        assert d['x'] == 'y'
+    """), check=True)
+
+def test_oob_buffers(heap):
+    d = Box[Dict](heap)
+    d['a'] = pickle.PickleBuffer(bytearray(b'foo'))
+    d['b'] = [pickle.PickleBuffer(b'bar'), 'baz']
+    assert d['a'] == b'foo'
+    assert bytes(d['b'][0]) == b'bar'
+    assert d['b'][1] == 'baz'
+
+    a = d['a']
+    a[0] = ord('g')
+    d = pickle.loads(pickle.dumps(d))
+    assert d['a'] == b'foo'
+
+def test_batch(heap):
+    d = Box[Dict](heap)
+    d['a'] = 1
+    other = pickle.loads(pickle.dumps(d))
+    with d:
+        d.clear()
+        d['b'] = 2
+        with d:
+            d['c'] = [3]
+        assert other == { 'a': 1 }
+        assert d == { 'b': 2, 'c': [3] }
+        d.copy()['c'] = 4
+        assert d['c'] == [3]
+    assert other == { 'b': 2, 'c': [3] }
+
+    l = Box[List](heap)
+    l.append(1)
+    with pytest.raises(ZeroDivisionError):
+        with l:
+            l.append(2)
+            with l:
+                l.append(3)
+            1 / 0
+    assert list(l) == [1]
+
+    # Flushing explicitly still publishes the changes made so far
+    with pytest.raises(ZeroDivisionError):
+        with l:
+            l.append(2)
+            l.flush()
+            l.append(3)
+            1 / 0
+    assert list(l) == [1, 2]
+
+def test_reserve(heap):
+    d = Box[Dict](heap)
+    d['a'] = 'b'
+    d.reserve(4096)
+    start = d._hdr[0]
+    assert d._hdr[1] >= 4096
+    assert d == { 'a': 'b' }
+    d.update((str(i), i) for i in range(100))
+    assert d._hdr[0] == start
+
+def test_generation(heap):
+    d = Box[Dict](heap)
+    other = pickle.loads(pickle.dumps(d))
+    d['a'] = 1
+    assert other._object is other._object
+    assert other == { 'a': 1 }
+
+    # Modifying while iterating uses a copy
+    for k in d:
+        del d[k]
+    assert other == {}
+
+    d['b'] = 2
+    with pytest.raises(TypeError):
+        d.update([('c', 3), 4])
+    assert d == { 'b': 2 }
+    assert other == { 'b': 2 }
+
+    other.clear()
+    assert d == {}
+
+def test_mutable_values(heap):
+    d = Box[Dict](heap)
+    other = pickle.loads(pickle.dumps(d))
+    d['l'] = [1]
+    v = other['l']
+    v.append(2)
+    assert other['l'] == [1]
+    assert d['l'] == [1]
+    assert other._object is not other._object
+
+    l = Box[List](heap)
+    l.append({})
+    l[0]['a'] = 1
+    assert l[0] == {}
+
+    d['l'] = (1, 'a')
+    assert other._object is other._object
+
+class JSONDict(Dict):
+    def _dumps(self, v):
+        return [json.dumps(v).encode()]
+
+    def _loads(self, data):
+        return json.loads(bytes(data))
+
+def test_serializer(heap):
+    d = Box[JSONDict](heap)
+    d['a'] = [1, 2]
+    assert bytes(d._deref_object()[:d._hdr[2]]) == b'{"a": [1, 2]}'
+    d = pickle.loads(pickle.dumps(d))
+    assert d == { 'a': [1, 2] }
+
+class Reentrant:
+    def __init__(self, other):
+        self.other = other
+
+    def __reduce__(self):
+        self.other['reduced'] = True
+        return str, ('reentrant',)
+
+def test_reentrant_pickle(heap):
+    d = Box[Dict](heap)
+    other = Box[Dict](heap)
+    d['a'] = Reentrant(other)
+    d['b'] = 'b'
+    assert d == { 'a': 'reentrant', 'b': 'b' }
+    assert other == { 'reduced': True }
+
 @given(st.integers(max_value=0))
 def test_bad_size(n):
     with pytest.raises(ValueError):
         Array[Size_t, n]
 
+def text_pool(n, seed=0):
+    # st.text() is slow, so draw from a fixed pool of strings instead. Include
+    # some non-ASCII characters, since these are pickled differently.
+    rng = random.Random(seed)
+    alphabet = string.printable + '\0\xe9\u03bb\u5e73\U0001f600'
+    return ('',) + tuple(''.join(rng.choices(alphabet, k=rng.randint(1, 20)))
+                         for _ in range(n - 1))
+
+texts = st.sampled_from(text_pool(256))
+
+# Only compare one kind of iterator per rule invocation
+dict_iters = (
+    iter,
+    reversed,
+    lambda d: d.items(),
+    lambda d: d.keys(),
+    lambda d: d.values(),
+)
+
 @settings(max_examples=25, deadline=5000)
 class DictComparison(RuleBasedStateMachine):
     keys = Bundle('keys')
     values = Bundle('values')
     heap = Heap()
+    # Dicts from previous runs, which can be reused
+    pool = []
 
     def __init__(self):
         super().__init__()
-        self.dict = Box[Dict](self.heap)
+        self.dict = self.pool.pop() if self.pool else Box[Dict](self.heap)
         self.model = {}
 
-    @rule(target=keys, k=st.text())
+    def teardown(self):
+        self.dict.clear()
+        self.pool.append(self.dict)
+
+    @rule(target=keys, k=texts)
     def key(self, k):
         return k
 
-    @rule(target=values, v=st.text())
+    @rule(target=values, v=texts)
     def value(self, v):
         return v
 
@@ -117,62 +585,93 @@ class DictComparison(RuleBasedStateMachine):
         else:
             del self.dict[k]
 
-    @rule()
-    def iters(self):
-        for f in (
-            iter,
-            reversed,
-            lambda d: d.items(),
-            lambda d: d.keys(),
-            lambda d: d.values(),
-        ):
-            for m, d in zip(f(self.model), f(self.dict)):
-                assert m == d
+    @rule(f=st.sampled_from(dict_iters))
+    def iters(self, f):
+        assert list(f(self.model)) == list(f(self.dict))
 
     @rule(k=keys)
     def contains(self, k):
         assert (k in self.model) == (k in self.dict)
 
-    @rule(other=st.dictionaries(keys, values))
-    def update(self, other):
-        self.model.update(other)
-        self.dict.update(other)
-
-    @rule(other=st.dictionaries(keys, values))
-    def ior(self, other):
-        self.model |= other
-        self.dict |= other
-
-    @rule(other=st.dictionaries(keys, values))
-    def union(self, other):
-        assert (self.model | other) == (self.dict | other)
+    @rule(op=st.sampled_from(('update', 'ior', 'union')),
+          other=st.dictionaries(keys, values))
+    def dict_op(self, op, other):
+        if op == 'update':
+            self.model.update(other)
+            self.dict.update(other)
+        elif op == 'ior':
+            self.model |= other
+            self.dict |= other
+        else:
+            assert (self.model | other) == (self.dict | other)
 
     @rule()
     def clear(self):
         self.model.clear()
         self.dict.clear()
 
-DictTest = DictComparison.TestCase
+DictTest = pytest.mark.slow(DictComparison.TestCase)
+
+# The state machines above are thorough, but slow, so they only run with
+# --run-slow. Always run the same rules on long, seeded streams of random
+# operations, which are cheap to generate.
+
+def random_text(rng):
+    return ''.join(rng.choice('ab\xe9\U0001f600') for _ in range(rng.randrange(4)))
+
+def random_dict(rng):
+    return { random_text(rng): random_text(rng) for _ in range(rng.randrange(4)) }
+
+dict_ops = (
+    lambda m, rng: m.len(),
+    lambda m, rng: m.getitem(random_text(rng)),
+    lambda m, rng: m.setitem(random_text(rng), random_text(rng)),
+    lambda m, rng: m.delitem(random_text(rng)),
+    lambda m, rng: m.iters(rng.choice(dict_iters)),
+    lambda m, rng: m.contains(random_text(rng)),
+    lambda m, rng: m.dict_op(rng.choice(('update', 'ior', 'union')), random_dict(rng)),
+    lambda m, rng: m.clear(),
+)
+
+def run_ops(machine, ops, seed, n=500):
+    rng = random.Random(seed)
+    try:
+        for _ in range(n):
+            rng.choice(ops)(machine, rng)
+    finally:
+        machine.teardown()
+
+@pytest.mark.parametrize('seed', range(4))
+def test_dict_ops(seed):
+    run_ops(DictComparison(), dict_ops, seed)
+
+list_iters = (iter, reversed)
 
 @settings(max_examples=25)
 class ListComparison(RuleBasedStateMachine):
     indices = Bundle('indices')
     values = Bundle('values')
     heap = Heap()
+    # Lists from previous runs, which can be reused
+    pool = []
 
     def __init__(self):
         super().__init__()
-        self.list = Box[List](self.heap)
+        self.list = self.pool.pop() if self.pool else Box[List](self.heap)
         self.model = []
         self.next_index = 0
 
+    def teardown(self):
+        self.list.clear()
+        self.pool.append(self.list)
+
     @rule(target=indices)
     def new_index(self):
         next_index = self.next_index
         self.next_index = next_index + 1
         return next_index
 
-    @rule(target=values, v=st.text())
+    @rule(target=values, v=texts)
     def value(self, v):
         return v
 
@@ -224,14 +723,9 @@ class ListComparison(RuleBasedStateMachine):
     def count(self, v):
         assert self.model.count(v) == self.list.count(v)
 
-    @rule()
-    def iters(self):
-        for f in (
-            iter,
-            reversed
-        ):
-            for m, d in zip(f(self.model), f(self.list)):
-                assert m == d
+    @rule(f=st.sampled_from(list_iters))
+    def iters(self, f):
+        assert list(f(self.model)) == list(f(self.list))
 
     @rule(v=values)
     def contains(self, v):
@@ -246,6 +740,7 @@ class ListComparison(RuleBasedStateMachine):
     def iadd(self, other):
         self.model += other
         self.list += other
+        assert isinstance(self.list, List)
         return self.extend_indices(other)
 
     @rule(target=indices, i=indices, v=values)
@@ -265,6 +760,11 @@ class ListComparison(RuleBasedStateMachine):
         self.model.reverse()
         self.list.reverse()
 
+    @rule()
+    def clear(self):
+        self.model.clear()
+        self.list.clear()
+
     @rule(target=indices, l=st.lists(values))
     def extend(self, l):
         self.model.extend(l)
@@ -291,4 +791,34 @@ class ListComparison(RuleBasedStateMachine):
         else:
             self.list.remove(v)
 
-ListTest = ListComparison.TestCase
+ListTest = pytest.mark.slow(ListComparison.TestCase)
+
+def random_index(m, rng):
+    # Include out-of-range indices
+    n = len(m.model) + 2
+    return rng.randrange(-n, n)
+
+def random_list(rng):
+    return [random_text(rng) for _ in range(rng.randrange(4))]
+
+list_ops = (
+    lambda m, rng: m.len(),
+    lambda m, rng: m.getitem(random_index(m, rng)),
+    lambda m, rng: m.setitem(random_index(m, rng), random_text(rng)),
+    lambda m, rng: m.delitem(random_index(m, rng)),
+    lambda m, rng: m.index(random_text(rng), random_index(m, rng), random_index(m, rng)),
+    lambda m, rng: m.count(random_text(rng)),
+    lambda m, rng: m.iters(rng.choice(list_iters)),
+    lambda m, rng: m.contains(random_text(rng)),
+    lambda m, rng: m.iadd(random_list(rng)),
+    lambda m, rng: m.insert(random_index(m, rng), random_text(rng)),
+    lambda m, rng: m.append(random_text(rng)),
+    lambda m, rng: m.reverse(),
+    lambda m, rng: m.extend(random_list(rng)),
+    lambda m, rng: m.pop(random_index(m, rng)),
+    lambda m, rng: m.remove(random_text(rng)),
+)
+
+@pytest.mark.parametrize('seed', range(4))
+def test_list_ops(seed):
+    run_ops(ListComparison(), list_ops, seed)
@@ -1,13 +1,14 @@
 # SPDX-License-Identifier: GPL-3.0-only
 # Copyright (C) 2022 Sean Anderson <seanga2@gmail.com>
 
-import math
 import mmap
 
 import pytest
 from hypothesis import assume, given, strategies as st
 
-from mpmetrics.util import align, align_down, genmask
+import _mpmetrics
+from mpmetrics import util
+from mpmetrics.util import align, align_down, genmask, make_aligner
 
 @given(st.integers(), st.integers(0, 100).map(lambda n: 1 << n))
 def test_align(x, a):
@@ -21,7 +22,9 @@ def test_align(x, a):
     assert res <= x
     assert res + a >= x
 
-@given(st.integers(), st.integers(1).filter(lambda a: math.log2(a) % 1))
+    assert make_aligner(a)(x) == align(x, a)
+
+@given(st.integers(), st.integers(1).filter(lambda a: a & (a - 1)))
 def test_npot(x, a):
     with pytest.raises(ValueError):
         align(x, a)
@@ -29,8 +32,33 @@ def test_npot(x, a):
     with pytest.raises(ValueError):
         align_down(x, a)
 
+    with pytest.raises(ValueError):
+        make_aligner(a)
+
 @given(st.integers(0, 63), st.integers(0, 63))
 def test_genmask(hi, lo):
     assume(hi >= lo)
     for bit in range(lo, hi):
         assert (1 << bit) & genmask(hi, lo)
+
+def check_same(py, c, *args):
+    try:
+        expected = py(*args)
+    except ValueError:
+        with pytest.raises(ValueError):
+            c(*args)
+    else:
+        assert c(*args) == expected
+
+# Include values on either side of the C fast path's limits
+edges = st.sampled_from((-(1 << 63) - 1, -(1 << 63), (1 << 63) - 1, 1 << 63, 1 << 64))
+ints = st.one_of(st.integers(), edges)
+
+@given(ints, st.one_of(st.integers(), st.integers(0, 100).map(lambda n: 1 << n)))
+def test_c_align(x, a):
+    check_same(util._py_align, _mpmetrics.align, x, a)
+    check_same(util._py_align_down, _mpmetrics.align_down, x, a)
+
+@given(st.integers(-2, 200), st.integers(-2, 200))
+def test_c_genmask(hi, lo):
+    check_same(util._py_genmask, _mpmetrics.genmask, hi, lo)
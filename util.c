@@ -0,0 +1,146 @@
+// SPDX-License-Identifier: LGPL-3.0-only
+/*
+ * Copyright (C) 2022 Sean Anderson <seanga2@gmail.com>
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+#include <stdbool.h>
+
+#include "_mpmetrics.h"
+
+/*
+ * These functions have a fast path for values which fit in a long long, and
+ * fall back to their (pure python) counterparts in mpmetrics.util for
+ * everything else, including errors. This way, they behave exactly the same.
+ */
+
+static PyObject *fallback(const char *name, PyObject *const *args,
+			  Py_ssize_t nargs)
+{
+	PyObject *util, *func, *ret;
+
+	util = PyImport_ImportModule("mpmetrics.util");
+	if (!util)
+		return NULL;
+
+	func = PyObject_GetAttrString(util, name);
+	Py_DECREF(util);
+	if (!func)
+		return NULL;
+
+	ret = PyObject_Vectorcall(func, args, nargs, NULL);
+	Py_DECREF(func);
+	return ret;
+}
+
+static bool as_long_longs(PyObject *const *args, Py_ssize_t nargs,
+			  long long *x, long long *y)
+{
+	int overflow;
+
+	if (nargs != 2 || !PyLong_CheckExact(args[0]) ||
+	    !PyLong_CheckExact(args[1]))
+		return false;
+
+	*x = PyLong_AsLongLongAndOverflow(args[0], &overflow);
+	if (overflow)
+		return false;
+
+	*y = PyLong_AsLongLongAndOverflow(args[1], &overflow);
+	return !overflow;
+}
+
+static PyObject *align(PyObject *self, PyObject *const *args,
+		       Py_ssize_t nargs)
+{
+	long long x, a, ret;
+
+	if (!as_long_longs(args, nargs, &x, &a) || a <= 0 || a & (a - 1) ||
+	    __builtin_add_overflow(x, a - 1, &ret))
+		return fallback("_py_align", args, nargs);
+
+	return PyLong_FromLongLong(ret & ~(a - 1));
+}
+
+static PyObject *align_down(PyObject *self, PyObject *const *args,
+			    Py_ssize_t nargs)
+{
+	long long x, a;
+
+	if (!as_long_longs(args, nargs, &x, &a) || a <= 0 || a & (a - 1))
+		return fallback("_py_align_down", args, nargs);
+
+	return PyLong_FromLongLong(x & ~(a - 1));
+}
+
+static PyObject *genmask(PyObject *self, PyObject *const *args,
+			 Py_ssize_t nargs)
+{
+	unsigned long long mask;
+	long long hi, lo;
+
+	if (!as_long_longs(args, nargs, &hi, &lo) || hi < 0 || hi >= 64 ||
+	    lo < 0 || lo >= 64)
+		return fallback("_py_genmask", args, nargs);
+
+	mask = ~0ULL << lo;
+	if (hi < 63)
+		mask &= ~(~0ULL << (hi + 1));
+	return PyLong_FromUnsignedLongLong(mask);
+}
+
+PyMethodDef UtilMethods[] = {
+	{
+		.ml_name = "align",
+		.ml_meth = (PyCFunction)(void (*)(void))align,
+		.ml_flags = METH_FASTCALL,
+		.ml_doc = PyDoc_STR("align($module, x, a, /)\n"
+				    "--\n"
+				    "\n"
+				    "Align `x` to `a`\n"
+				    "\n"
+				    ":param int x: The value to align\n"
+				    ":param int a: The alignment; must be a power of two\n"
+				    ":return: The smallest multiple of `a` greater than `x`\n"
+				    ":rtype: int\n"),
+	},
+	{
+		.ml_name = "align_down",
+		.ml_meth = (PyCFunction)(void (*)(void))align_down,
+		.ml_flags = METH_FASTCALL,
+		.ml_doc = PyDoc_STR("align_down($module, x, a, /)\n"
+				    "--\n"
+				    "\n"
+				    "Align `x` down to `a`\n"
+				    "\n"
+				    ":param int x: The value to align\n"
+				    ":param int a: The alignment; must be a power of two\n"
+				    ":return: The largest multiple of `a` less than `x`\n"
+				    ":rtype: int\n"),
+	},
+	{
+		.ml_name = "genmask",
+		.ml_meth = (PyCFunction)(void (*)(void))genmask,
+		.ml_flags = METH_FASTCALL,
+		.ml_doc = PyDoc_STR("genmask($module, hi, lo, /)\n"
+				    "--\n"
+				    "\n"
+				    "Generate a mask with bits between `hi` `lo` set.\n"
+				    "\n"
+				    ":param int hi: The highest bit to set, inclusive\n"
+				    ":param int lo: The lowest bit to set, inclusive\n"
+				    ":return: The bitmask\n"
+				    ":rtype: int\n"
+				    "\n"
+				    "`hi` must be greater than `lo`. Bits are numbered in \"little-endian\" order,\n"
+				    "starting from zero. The following invariant holds::\n"
+				    "\n"
+				    "    mask = 0\n"
+				    "    for n in range(lo, hi):\n"
+				    "        mask |= 1 << n\n"
+				    "    assert mask == genmask(hi, lo)\n"),
+	},
+	{ 0 },
+};